@@ -0,0 +1,201 @@
+"""
+Admission control: every HTTP request is put in a priority class by method and
+path, then checked against the class's concurrency limit and a per-client token
+bucket before it reaches the app.
+
+- critical (SOS alert, voice upload): no concurrency limit, not rate limited by
+  default, and a reserved database pool (see database.get_sos_db)
+- normal: most endpoints
+- low: large reads and batch jobs that load the database and event loop; shed first
+- llm: support chatbot, mostly waiting on the model, so it gets more slots than low
+
+A full class answers 503 once the request has waited ADMISSION_QUEUE_TIMEOUT for
+a slot; an empty token bucket answers 429. Both carry Retry-After. Token buckets
+are only used when ADMISSION_CLIENT_HEADER identifies clients behind the proxy.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from starlette.responses import JSONResponse
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_REJECTED
+
+# === CONFIG ===
+# In-flight request limits per class (0 = unlimited). Low-priority responses can be
+# large enough to hold the event loop for a while, so only a couple run at once
+ADMISSION_LIMIT_NORMAL = int(os.getenv("ADMISSION_LIMIT_NORMAL", 128))
+ADMISSION_LIMIT_LOW = int(os.getenv("ADMISSION_LIMIT_LOW", 2))
+ADMISSION_LIMIT_LLM = int(os.getenv("ADMISSION_LIMIT_LLM", 48))
+# Seconds a request may wait for a slot in its class before it is shed with 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 0.5))
+# Token buckets per client and class: sustained requests/second and burst size (0 = no limit).
+# An SOS alert is never refused by default: clients behind one proxy or NAT share a bucket
+ADMISSION_RATE_CRITICAL = float(os.getenv("ADMISSION_RATE_CRITICAL", 0))
+ADMISSION_BURST_CRITICAL = float(os.getenv("ADMISSION_BURST_CRITICAL", 20))
+ADMISSION_RATE_NORMAL = float(os.getenv("ADMISSION_RATE_NORMAL", 20))
+ADMISSION_BURST_NORMAL = float(os.getenv("ADMISSION_BURST_NORMAL", 60))
+ADMISSION_RATE_LOW = float(os.getenv("ADMISSION_RATE_LOW", 2))
+ADMISSION_BURST_LOW = float(os.getenv("ADMISSION_BURST_LOW", 10))
+ADMISSION_RATE_LLM = float(os.getenv("ADMISSION_RATE_LLM", 1))
+ADMISSION_BURST_LLM = float(os.getenv("ADMISSION_BURST_LLM", 5))
+# Header carrying the real client address behind a proxy (first entry wins), e.g. x-forwarded-for.
+# Per-client rate limits only apply when it is set: otherwise every user behind the proxy or a
+# NAT would share one bucket. The concurrency limits apply either way
+ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER")
+# Clients whose buckets are remembered; the least recently seen are dropped first
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", 10_000))
+
+CRITICAL, NORMAL, LOW, LLM = "critical", "normal", "low", "llm"
+
+# (method, path prefix) -> class; first match wins, everything else is normal.
+# Voice job polling (GET /upload-voice/{id}) is normal, so it cannot use up SOS capacity,
+# and so are the paginated reads (all-incidents, search, nearby) that admins page through
+ROUTE_CLASSES = [
+    ("POST", "/contact", CRITICAL),
+    ("POST", "/upload-voice", CRITICAL),
+    ("GET", "/incidents/classified-incidents", LOW),
+    ("GET", "/incidents/hotspots", LOW),
+    ("POST", "/incidents/bulk", LOW),
+    ("POST", "/incidents/reclassify", LOW),
+    ("GET", "/chat/export", LOW),
+    ("POST", "/support-chatbot", LLM),
+]
+
+
+def classify(method: str, path: str) -> str:
+    for route_method, prefix, priority in ROUTE_CLASSES:
+        if method == route_method and path.startswith(prefix):
+            return priority
+    return NORMAL
+
+
+class TokenBuckets:
+    """
+    Per-client token buckets in a bounded LRU: `rate` tokens a second up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: float, maxsize: int = ADMISSION_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """
+        Spend one token; returns 0 when allowed, else seconds until a token is available.
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets[client] = (tokens - 1, now)
+            wait = 0.0
+        else:
+            self._buckets[client] = (tokens, now)
+            wait = (1 - tokens) / self.rate
+        self._buckets.move_to_end(client)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+@dataclass
+class PriorityClass:
+    name: str
+    limit: int
+    buckets: TokenBuckets
+    in_flight: int = 0
+    _slots: asyncio.Semaphore | None = field(default=None, repr=False)
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.limit <= 0:
+            return True
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.limit)
+        if self._slots.locked() and timeout <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def release(self):
+        if self.limit > 0:
+            self._slots.release()
+
+
+def default_classes() -> dict[str, PriorityClass]:
+    return {
+        CRITICAL: PriorityClass(CRITICAL, 0, TokenBuckets(ADMISSION_RATE_CRITICAL, ADMISSION_BURST_CRITICAL)),
+        NORMAL: PriorityClass(NORMAL, ADMISSION_LIMIT_NORMAL, TokenBuckets(ADMISSION_RATE_NORMAL, ADMISSION_BURST_NORMAL)),
+        LOW: PriorityClass(LOW, ADMISSION_LIMIT_LOW, TokenBuckets(ADMISSION_RATE_LOW, ADMISSION_BURST_LOW)),
+        LLM: PriorityClass(LLM, ADMISSION_LIMIT_LLM, TokenBuckets(ADMISSION_RATE_LLM, ADMISSION_BURST_LLM)),
+    }
+
+
+def client_key(scope) -> str | None:
+    """
+    Rate-limit key for the request, or None when clients cannot be told apart.
+    """
+    if not ADMISSION_CLIENT_HEADER:
+        return None
+    name = ADMISSION_CLIENT_HEADER.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1").split(",")[0].strip()
+    # Sent straight to the app, past the proxy
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the priority classes above. A slot is held until the
+    response (including a streamed body) has been sent.
+    """
+
+    def __init__(self, app, classes: dict[str, PriorityClass] | None = None,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.app = app
+        self.classes = classes or default_classes()
+        self.queue_timeout = queue_timeout
+
+    async def __call__(self, scope, receive, send):
+        # CORS preflights and websockets are not admitted here
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.classes[classify(scope["method"], scope["path"])]
+
+        client = client_key(scope)
+        wait = priority.buckets.take(client) if client is not None else 0.0
+        if wait > 0:
+            ADMISSION_REJECTED.labels(priority.name, "rate_limited").inc()
+            await self._reject(scope, receive, send, 429, "Too many requests", wait)
+            return
+
+        if not await priority.acquire(self.queue_timeout):
+            ADMISSION_REJECTED.labels(priority.name, "overloaded").inc()
+            await self._reject(scope, receive, send, 503, "Server busy, please retry", 1)
+            return
+
+        priority.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(priority.name).inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            priority.in_flight -= 1
+            ADMISSION_IN_FLIGHT.labels(priority.name).dec()
+            priority.release()
+
+    @staticmethod
+    async def _reject(scope, receive, send, status: int, detail: str, retry_after: float):
+        response = JSONResponse(
+            {"detail": detail}, status_code=status, headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
+        await response(scope, receive, send)
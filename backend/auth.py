@@ -3,9 +3,9 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from passlib.context import CryptContext
 import models, database
+from user_cache import get_user_by_email
+from utils import pwd_context  # shared so the configured bcrypt cost applies
 
 # JWT Configuration
 SECRET_KEY = "SUPER_SECRET_KEY_CHANGE_ME"
@@ -13,7 +13,6 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 # Security context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Password helpers
@@ -49,9 +48,8 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    # Check user from DB
-    result = await db.execute(select(models.User).where(models.User.email == email))
-    user = result.scalar_one_or_none()
+    # Check user from the cache, falling back to the DB
+    user = await get_user_by_email(db, email)
     if user is None:
         raise credentials_exception
 
@@ -0,0 +1,189 @@
+"""
+SOS latency while expensive routes are saturated, with admission control off
+and on.
+
+Starts the app under uvicorn in a subprocess (SQLite, stub LLM, fake WhatsApp
+transport). Many simulated clients, each with its own X-Forwarded-For address,
+hammer the dashboard, search and chatbot routes. A probe meanwhile sends one
+/contact SOS alert every --probe-interval seconds (each from a new address, so
+the SOS rate limit is not what is measured). "off" disables the class limits,
+the rate limits and the reserved SOS pool. Server, load and probe share the
+machine's CPUs, so keep --load-processes below the core count.
+
+    python benchmarks/admission_bench.py --incidents 20000 --clients 200 --seconds 15
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from common import create_schema, percentile, start_app, start_stub, wait_ready
+
+import httpx
+from sqlalchemy import insert, text, update
+from sqlalchemy.future import select
+import geo
+from database import AsyncSessionLocal, engine
+from init_db import init_db
+from models import Incident, utcnow
+
+ADMISSION_OFF = {
+    "ADMISSION_LIMIT_NORMAL": "0", "ADMISSION_LIMIT_LOW": "0", "ADMISSION_LIMIT_LLM": "0",
+    "ADMISSION_RATE_CRITICAL": "0", "ADMISSION_RATE_NORMAL": "0", "ADMISSION_RATE_LOW": "0",
+    "ADMISSION_RATE_LLM": "0", "SOS_DB_POOL_SIZE": "0",
+}
+
+LOAD = [
+    ("GET", "/incidents/classified-incidents", None),
+    ("GET", "/incidents/search", {"q": "phone help"}),
+    ("GET", "/incidents/hotspots", {"precision": 6}),
+    ("POST", "/support-chatbot/", {"message": "My partner shouted at me again and I don't feel safe."}),
+]
+
+
+async def seed(rows: int):
+    rng = random.Random(rows)
+    async with AsyncSessionLocal() as db:
+        now = utcnow()
+        for start in range(0, rows, 5000):
+            await db.execute(insert(Incident), [
+                {
+                    "location": "Soweto",
+                    "description": "He shouted at me and took my phone so I could not call anyone for help.",
+                    "status": "pending",
+                    "latitude": -26.2 + rng.uniform(-0.1, 0.1),
+                    "longitude": 27.9 + rng.uniform(-0.1, 0.1),
+                    "updated_at": now,
+                }
+                for _ in range(start, min(start + 5000, rows))
+            ])
+        await db.commit()
+    # Geohashes are derived by the API on insert; fill them for the seeded rows
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Incident.id, Incident.latitude, Incident.longitude))
+        await db.execute(update(Incident), [
+            {"id": row.id, "geohash": geo.encode(row.latitude, row.longitude)} for row in result.all()
+        ])
+        await db.commit()
+
+
+async def load_client(client: httpx.AsyncClient, index: int, deadline: float, statuses: Counter):
+    address = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+    rng = random.Random(index)
+    while time.monotonic() < deadline:
+        method, path, params = rng.choice(LOAD)
+        request = {"params": params} if method == "GET" else {"json": params}
+        try:
+            # Bodies are drained undecoded so the load generator stays cheap
+            async with client.stream(method, path, headers={"x-forwarded-for": address}, **request) as response:
+                async for _ in response.aiter_raw():
+                    pass
+            statuses[response.status_code] += 1
+            if response.status_code in (429, 503):
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)) * rng.uniform(0.2, 1))
+        except httpx.HTTPError:
+            statuses["error"] += 1
+
+
+def load_process(base_url: str, first: int, count: int, seconds: float) -> Counter:
+    async def main():
+        statuses = Counter()
+        deadline = time.monotonic() + seconds
+        limits = httpx.Limits(max_connections=count, max_keepalive_connections=count)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            await asyncio.gather(*(load_client(client, i, deadline, statuses) for i in range(first, first + count)))
+        return statuses
+    return asyncio.run(main())
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float, statuses: Counter):
+    latencies = []
+    i = 0
+    while not stop.is_set():
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.post("/contact", json={
+                "latitude": -26.2, "longitude": 28.0, "phone": "+27000000000", "message": f"SOS probe {i}",
+            }, headers={"x-forwarded-for": f"192.168.{i // 256 % 256}.{i % 256}"})
+            statuses[response.status_code] += 1
+        except httpx.HTTPError:
+            statuses["error"] += 1
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def scenario(name: str, env: dict, args, load: bool):
+    server, base_url = start_app(env)
+    try:
+        await wait_ready(base_url, server)
+        loop = asyncio.get_running_loop()
+        load_statuses, probe_statuses = Counter(), Counter()
+        # The load runs in separate processes so it cannot slow down the probe's own event loop
+        with ProcessPoolExecutor(max_workers=args.load_processes) as pool:
+            per_process = args.clients // args.load_processes
+            loaders = [
+                loop.run_in_executor(pool, load_process, base_url, n * per_process, per_process, args.seconds)
+                for n in range(args.load_processes if load else 0)
+            ]
+            async with httpx.AsyncClient(base_url=base_url, timeout=60) as probe_client:
+                stop = asyncio.Event()
+                probe_task = asyncio.create_task(probe(probe_client, stop, args.probe_interval, probe_statuses))
+                await asyncio.sleep(args.seconds)
+                stop.set()
+                latencies = await probe_task
+            for statuses in await asyncio.gather(*loaders):
+                load_statuses.update(statuses)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{name:<22} SOS n={len(latencies):4d}  p50 {percentile(latencies, 50) * 1000:8.1f} ms"
+          f"  p95 {percentile(latencies, 95) * 1000:8.1f} ms  p99 {percentile(latencies, 99) * 1000:8.1f} ms"
+          f"  SOS statuses {dict(probe_statuses)}")
+    if load:
+        print(f"{'':<22} load statuses {dict(sorted(load_statuses.items(), key=str))}")
+
+
+async def run(args):
+    await create_schema()
+    await seed(args.incidents)
+    await init_db()
+    async with engine.begin() as conn:
+        # Default rollback journaling lets a stream of readers starve every writer (the SOS insert);
+        # WAL behaves like Postgres here: readers never block the writer
+        await conn.execute(text("PRAGMA journal_mode=WAL"))
+    # Own process, so streaming stub threads do not compete with the probe for the GIL
+    stub, stub_port = start_stub("stub_groq.py", "--latency", str(args.llm_latency))
+    stub_url = f"http://127.0.0.1:{stub_port}/openai/v1/chat/completions"
+
+    env = {
+        **os.environ,
+        "GROQ_URL": stub_url,
+        "GROQ_API_KEY": "bench",
+        "NOTIFY_TRANSPORT": "fake",
+        "VOICE_JOBS_MODE": "worker",
+        "ADMISSION_CLIENT_HEADER": "x-forwarded-for",
+        "SLOW_QUERY_MS": "1000000",
+    }
+    try:
+        await scenario("idle", env, args, load=False)
+        await scenario("saturated, admission off", {**env, **ADMISSION_OFF}, args, load=True)
+        await scenario("saturated, admission on", env, args, load=True)
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=20_000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--load-processes", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--probe-interval", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    asyncio.run(run(parser.parse_args()))
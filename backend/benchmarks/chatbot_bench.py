@@ -0,0 +1,117 @@
+"""
+Support chatbot latency against a local stub LLM server.
+
+Reports time to first visible text for the previous blocking call (full reply
+via requests.post), the pooled non-streaming route and the SSE streaming route,
+plus how quickly the streaming route falls back when the upstream stalls, and
+a mixed workload where helpline requests are answered by the local intent router.
+
+    python benchmarks/chatbot_bench.py --users 20 --latency 0.3 --token-delay 0.03
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_groq import start_stub_server
+from benchmarks.common import percentile
+
+MESSAGE = "My partner shouted at me again last night and I don't feel safe at home."
+HELPLINE_MESSAGES = [
+    "What is the police number?",
+    "gbv helpline",
+    "Which number do I call for my child?",
+    "Can I get the helplines please",
+]
+
+
+def blocking_baseline(url: str, users: int) -> list[float]:
+    # Mirrors the old route: new connection, whole reply before anything is shown, and
+    # because requests.post blocked the event loop, users who arrive together are served in turn
+    from routes.chatbot_route import build_messages
+
+    timings = []
+    start = time.perf_counter()
+    for _ in range(users):
+        response = requests.post(url, json={"messages": build_messages(MESSAGE), "temperature": 0.8})
+        response.raise_for_status()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def timed_full(generate) -> float:
+    start = time.perf_counter()
+    await generate(MESSAGE)
+    return time.perf_counter() - start
+
+
+async def timed_first_token(stream) -> tuple[float, float, bool]:
+    start = time.perf_counter()
+    first = None
+    fallback = False
+    async for event in stream(MESSAGE):
+        if first is None and "delta" in event:
+            first = time.perf_counter() - start
+        if event.get("done"):
+            fallback = event["fallback"]
+    return first, time.perf_counter() - start, fallback
+
+
+def report(name: str, timings: list[float]):
+    print(f"{name:<34} p50 {percentile(timings, 50) * 1000:8.1f} ms   p95 {percentile(timings, 95) * 1000:8.1f} ms")
+
+
+async def run(args):
+    from routes import chatbot_route
+    from routes.chatbot_route import chatbot_client
+
+    server, url = start_stub_server(latency=args.latency, token_delay=args.token_delay)
+    chatbot_client.url = url
+
+    report("blocking requests.post (full)", blocking_baseline(url, args.users))
+
+    # Warm the shared pool (TLS context, first connection) like a running server would be
+    await chatbot_route.generate_supportive_reply(MESSAGE)
+
+    timings = await asyncio.gather(*(timed_full(chatbot_route.generate_supportive_reply) for _ in range(args.users)))
+    report("pooled POST / (full)", list(timings))
+
+    results = await asyncio.gather(*(timed_first_token(chatbot_route.stream_supportive_reply) for _ in range(args.users)))
+    report("SSE /stream (first token)", [r[0] for r in results])
+    report("SSE /stream (complete)", [r[1] for r in results])
+
+    # Half of the traffic asks for a number and never leaves the process
+    async def timed_message(message: str) -> float:
+        start = time.perf_counter()
+        await chatbot_route.generate_supportive_reply(message)
+        return time.perf_counter() - start
+
+    messages = [HELPLINE_MESSAGES[i // 2 % len(HELPLINE_MESSAGES)] if i % 2 else MESSAGE for i in range(args.users)]
+    timings = await asyncio.gather(*(timed_message(m) for m in messages))
+    report("mixed: routed locally", [t for m, t in zip(messages, timings) if m != MESSAGE])
+    report("mixed: forwarded to LLM", [t for m, t in zip(messages, timings) if m == MESSAGE])
+    print(f"router stats: {chatbot_route.intent_router.stats()}")
+    server.shutdown()
+
+    # Upstream that takes far longer than the first-token budget
+    slow_server, slow_url = start_stub_server(latency=args.stall)
+    chatbot_client.url = slow_url
+    results = await asyncio.gather(*(timed_first_token(chatbot_route.stream_supportive_reply) for _ in range(args.users)))
+    assert all(r[2] for r in results), "expected every reply to fall back"
+    report(f"SSE fallback (upstream {args.stall:.0f}s)", [r[0] for r in results])
+    slow_server.shutdown()
+
+    await chatbot_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="stub delay between tokens")
+    parser.add_argument("--stall", type=float, default=10, help="stub latency for the fallback run")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Throughput of incident classification against a local stub Groq server.
+
+Compares the previous serial loop (one blocking requests.post per incident)
+with the async client in concurrent single-request and batch modes.
+
+    python benchmarks/classifier_bench.py --incidents 100 --latency 0.2
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_groq import start_stub_server
+from classifier import classify_description, classify_batch, _single_prompt, _extract_json, _parse_prediction, SYSTEM_PROMPT
+from groq_client import GroqClient
+
+DESCRIPTIONS = [
+    "My partner hit me and pushed me against the wall.",
+    "He keeps insulting me and threatening to leave me with nothing.",
+    "A neighbour touched my daughter inappropriately.",
+    "I was forced into sex by someone I know.",
+]
+
+
+def serial_baseline(url: str, descriptions: list[str]):
+    # Mirrors the old classify_with_groq loop: new connection, blocking, one at a time
+    results = []
+    for description in descriptions:
+        response = requests.post(url, json={
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": _single_prompt(description)},
+            ],
+        }, headers={"Connection": "close"})
+        message = response.json()["choices"][0]["message"]["content"]
+        results.append(_parse_prediction(_extract_json(message, "{", "}")))
+    return results
+
+
+async def concurrent_single(client: GroqClient, descriptions: list[str]):
+    return await asyncio.gather(*(classify_description(d, client) for d in descriptions))
+
+
+async def concurrent_batch(client: GroqClient, descriptions: list[str], batch_size: int):
+    batches = [descriptions[i:i + batch_size] for i in range(0, len(descriptions), batch_size)]
+    results = await asyncio.gather(*(classify_batch(batch, client) for batch in batches))
+    return [prediction for batch in results for prediction in batch]
+
+
+def report(name: str, count: int, elapsed: float, baseline: float | None = None):
+    speedup = f"  x{baseline / elapsed:.1f}" if baseline else ""
+    print(f"{name:<28} {elapsed:8.2f}s  {count / elapsed:8.1f} incidents/s{speedup}")
+
+
+async def run(args):
+    server, url = start_stub_server(latency=args.latency)
+    descriptions = [DESCRIPTIONS[i % len(DESCRIPTIONS)] for i in range(args.incidents)]
+
+    start = time.perf_counter()
+    results = serial_baseline(url, descriptions)
+    baseline = time.perf_counter() - start
+    assert len(results) == args.incidents
+    report("serial requests.post", args.incidents, baseline)
+
+    client = GroqClient(url=url, api_key="stub", max_concurrency=args.concurrency)
+    try:
+        start = time.perf_counter()
+        results = await concurrent_single(client, descriptions)
+        assert len(results) == args.incidents
+        report(f"async single (c={args.concurrency})", args.incidents, time.perf_counter() - start, baseline)
+
+        start = time.perf_counter()
+        results = await concurrent_batch(client, descriptions, args.batch_size)
+        assert len(results) == args.incidents
+        report(f"async batch (n={args.batch_size})", args.incidents, time.perf_counter() - start, baseline)
+    finally:
+        await client.aclose()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub response latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
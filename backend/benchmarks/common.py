@@ -0,0 +1,81 @@
+"""
+Shared setup for benchmarks that need the application and a database.
+
+Import this module before any application module: it points DATABASE_URL at a
+throwaway SQLite file (unless one is already set) and puts the backend on sys.path.
+"""
+import os
+import sys
+import socket
+import asyncio
+import tempfile
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BENCH_DIR = tempfile.mkdtemp(prefix="gbv-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(BENCH_DIR, 'bench.db')}")
+
+
+async def create_schema():
+    from database import engine, Base
+    import models  # noqa: F401  (registers the tables)
+
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(script: str, *args: str) -> tuple[subprocess.Popen, int]:
+    """
+    Run one of the stub servers in its own process; returns (process, port).
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", script), "--port", str(port), *args],
+        stdout=subprocess.DEVNULL,
+    )
+    return process, port
+
+
+def start_app(env: dict) -> tuple[subprocess.Popen, str]:
+    """
+    Serve main:app under uvicorn in a subprocess; returns (process, base_url).
+    """
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(200):
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                await client.get("/metrics")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
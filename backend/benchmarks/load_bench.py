@@ -0,0 +1,483 @@
+"""
+Whole-API load test. Boots main:app under uvicorn against a local database (a
+throwaway SQLite file unless DATABASE_URL is set) with stub Groq and Twilio
+servers. It then drives traffic mixes and reports throughput and p50/p95/p99
+latency per endpoint. Results are saved as JSON; --compare prints the change
+against an earlier run, e.g. one taken on the previous commit.
+
+Mixes (all run in turn unless --mix is given):
+- reports: a burst of incident reports, some with coordinates, reporters checking
+  their own reports, and SOS alerts
+- chat: clients polling /chat/ with after_id and If-None-Match, sometimes posting
+- dashboard: admin screens (stats, incident pages, hotspots, search, active users,
+  single and batched status changes)
+- logins: users signing in
+- voice: voice notes from the uploads/ fixtures, polled until analysed
+- mixed: virtual users split across the personas above by MIXED_SHARE
+
+Each virtual user sends from its own X-Forwarded-For address, so admission rate
+limits apply per user as they would in production. 429/503 answers are counted
+in the statuses, not hidden. Load generators, server and stubs share the
+machine, so compare runs made on the same hardware.
+
+    python benchmarks/load_bench.py --users 50 --seconds 20 --output after.json --compare before.json
+"""
+import os
+import sys
+import json
+import glob
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from common import BACKEND_DIR, BENCH_DIR, create_schema, percentile, start_app, start_stub, wait_ready
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import insert, text
+import geo
+import utils
+from database import AsyncSessionLocal, engine
+from incident_status import STATUSES
+from init_db import init_db
+from models import ChatMessage, Incident, User
+
+MIXED_SHARE = {"chat": 40, "reports": 20, "dashboard": 15, "logins": 15, "voice": 10}
+
+LOCATIONS = ["Soweto", "Alexandra", "Tembisa", "Khayelitsha", "Umlazi", "Mamelodi"]
+DESCRIPTIONS = [
+    "He shouted at me and took my phone so I could not call anyone for help.",
+    "My partner hit me last night and threatened to do it again.",
+    "A neighbour keeps touching me when I walk past and I am scared.",
+    "My uncle hurts my little brother when our mother is at work.",
+    "I am not allowed to see my friends or have any money of my own.",
+]
+CATEGORIES = [None, "sexual abuse", "physical abuse", "emotional abuse", "child abuse"]
+SEARCHES = ["phone help", "hit threatened", "money friends", "neighbour scared"]
+PASSWORD = "secret"
+# Server-side totals from /metrics reported per mix, to help explain a latency change
+SERVER_COUNTERS = [
+    "db_pool_checkout_wait_seconds_count", "db_pool_checkout_wait_seconds_sum",
+    "db_query_duration_seconds_count", "db_query_duration_seconds_sum",
+    "external_call_duration_seconds_count", "external_call_duration_seconds_sum",
+    "admission_rejected_total",
+]
+FIXTURES = sorted(glob.glob(os.path.join(BACKEND_DIR, "uploads", "*.wav"))
+                  + glob.glob(os.path.join(BACKEND_DIR, "uploads", "*.webm")))
+
+
+# === SEED ===
+async def seed(args):
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    password_hash = utils.hash_password(PASSWORD)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"full_name": f"User {i}", "email": f"user{i}@example.com", "password": password_hash}
+            for i in range(args.accounts)
+        ])
+        for start in range(0, args.incidents, 5000):
+            rows = []
+            for _ in range(start, min(start + 5000, args.incidents)):
+                latitude, longitude = -26.2 + rng.uniform(-0.2, 0.2), 27.9 + rng.uniform(-0.2, 0.2)
+                created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 90))
+                category = rng.choice(CATEGORIES)
+                rows.append({
+                    "location": rng.choice(LOCATIONS),
+                    "description": rng.choice(DESCRIPTIONS),
+                    "status": rng.choice(STATUSES),
+                    "predicted_category": category,
+                    "confidence": None if category is None else round(rng.uniform(0.5, 1), 2),
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "geohash": geo.encode(latitude, longitude),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            await db.execute(insert(Incident), rows)
+        await db.execute(insert(ChatMessage), [
+            {"user_email": f"user{i % args.accounts}@example.com", "content": f"Sending strength to everyone here ({i})"}
+            for i in range(args.chat_messages)
+        ])
+        await db.commit()
+    # Search index and rollups for the seeded rows
+    await init_db()
+    if engine.dialect.name == "sqlite":
+        async with engine.begin() as conn:
+            # Readers would otherwise starve every writer under load
+            await conn.execute(text("PRAGMA journal_mode=WAL"))
+
+
+# === VIRTUAL USERS ===
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, index: int, args, recorder: "Recorder"):
+        self.client = client
+        self.index = index
+        self.args = args
+        self.recorder = recorder
+        self.rng = random.Random(index)
+        self.address = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+        self.email = f"user{index % args.accounts}@example.com"
+        self.chat_after_id = 0
+        self.chat_etag = None
+
+    async def request(self, label: str, method: str, path: str, headers: dict | None = None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, path, headers={"x-forwarded-for": self.address, **(headers or {})}, **kwargs
+            )
+        except httpx.HTTPError:
+            self.recorder.error(label, start)
+            return None
+        self.recorder.record(label, start, time.perf_counter() - start, response.status_code)
+        if response.status_code in (429, 503):
+            # Back off like a well-behaved client would
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)) * self.rng.uniform(0.5, 1))
+        return response
+
+    async def think(self):
+        await asyncio.sleep(self.rng.expovariate(1 / self.args.think) if self.args.think > 0 else 0)
+
+
+async def report(user: VirtualUser):
+    data = {"location": user.rng.choice(LOCATIONS), "description": user.rng.choice(DESCRIPTIONS)}
+    if user.rng.random() < 0.7:
+        data.update(latitude=-26.2 + user.rng.uniform(-0.2, 0.2), longitude=27.9 + user.rng.uniform(-0.2, 0.2))
+    if user.rng.random() < 0.5:
+        data.update(anonymous="true")
+    else:
+        data.update(reporter_email=user.email)
+    await user.request("POST /incidents/", "POST", "/incidents/", data=data)
+
+
+async def sos(user: VirtualUser):
+    await user.request("POST /contact", "POST", "/contact", json={
+        "latitude": -26.2, "longitude": 27.9, "phone": f"+2771{user.index:07d}", "message": "SOS! I need help",
+    })
+
+
+async def chat_poll(user: VirtualUser):
+    headers = {"if-none-match": user.chat_etag} if user.chat_etag else {}
+    response = await user.request("GET /chat/", "GET", "/chat/",
+                                  params={"after_id": user.chat_after_id, "limit": 50}, headers=headers)
+    if response is not None and response.status_code == 200:
+        user.chat_etag = response.headers.get("etag")
+        messages = response.json()
+        if messages:
+            user.chat_after_id = messages[-1]["id"]
+
+
+async def chat_post(user: VirtualUser):
+    await user.request("POST /chat/", "POST", "/chat/", json={
+        "user_email": user.email, "content": f"Thinking of you all today ({user.rng.randrange(10_000)})",
+    })
+
+
+async def dashboard_stats(user: VirtualUser):
+    await user.request("GET /incidents/stats", "GET", "/incidents/stats")
+
+
+async def my_reports(user: VirtualUser):
+    await user.request("GET /incidents/", "GET", "/incidents/", params={"reporter_email": user.email, "limit": 20})
+
+
+async def dashboard_incidents(user: VirtualUser):
+    await user.request("GET /incidents/all-incidents", "GET", "/incidents/all-incidents", params={"limit": 50})
+
+
+async def dashboard_hotspots(user: VirtualUser):
+    await user.request("GET /incidents/hotspots", "GET", "/incidents/hotspots", params={"precision": 6})
+
+
+async def dashboard_search(user: VirtualUser):
+    await user.request("GET /incidents/search", "GET", "/incidents/search", params={"q": user.rng.choice(SEARCHES)})
+
+
+async def dashboard_users(user: VirtualUser):
+    await user.request("GET /active", "GET", "/active", params={"limit": 50})
+
+
+async def dashboard_status(user: VirtualUser):
+    incident_id = user.rng.randint(1, user.args.incidents)
+    await user.request("PUT /incidents/{incident_id}/status", "PUT", f"/incidents/{incident_id}/status",
+                       data={"status": user.rng.choice(STATUSES)})
+
+
+async def dashboard_triage(user: VirtualUser):
+    incident_ids = user.rng.sample(range(1, user.args.incidents + 1), 25)
+    await user.request("PATCH /incidents/status", "PATCH", "/incidents/status", json={
+        "incident_ids": incident_ids, "status": user.rng.choice(STATUSES), "changed_by": user.email,
+    })
+
+
+async def login(user: VirtualUser):
+    await user.request("POST /login", "POST", "/login", json={"email": user.email, "password": PASSWORD})
+
+
+async def voice(user: VirtualUser):
+    path = user.rng.choice(FIXTURES)
+    with open(path, "rb") as fixture:
+        content = fixture.read()
+    response = await user.request("POST /upload-voice", "POST", "/upload-voice",
+                                  data={"phone": f"+2772{user.index:07d}"},
+                                  files={"file": (os.path.basename(path), content)})
+    if response is None or response.status_code != 202:
+        return
+    job_id = response.json()["job_id"]
+    # Poll the way the app does until the analysis finishes
+    for _ in range(20):
+        await asyncio.sleep(0.5)
+        status = await user.request("GET /upload-voice/{job_id}", "GET", f"/upload-voice/{job_id}")
+        if status is None or status.status_code != 200 or status.json()["status"] in ("done", "failed"):
+            return
+
+
+# persona -> [(weight, action)]
+MIXES = {
+    "reports": [(8, report), (2, my_reports), (1, sos)],
+    "chat": [(10, chat_poll), (1, chat_post)],
+    "dashboard": [(3, dashboard_stats), (3, dashboard_incidents), (2, dashboard_hotspots),
+                  (2, dashboard_search), (1, dashboard_users), (1, dashboard_status), (1, dashboard_triage)],
+    "logins": [(1, login)],
+    "voice": [(1, voice)],
+}
+
+
+def persona_for(mix: str, index: int) -> str:
+    if mix != "mixed":
+        return mix
+    names = list(MIXED_SHARE)
+    return random.Random(index).choices(names, weights=[MIXED_SHARE[name] for name in names])[0]
+
+
+async def virtual_user(user: VirtualUser, persona: str, deadline: float):
+    weights, actions = zip(*MIXES[persona])
+    # Spread the first requests out instead of starting in lockstep
+    await asyncio.sleep(user.rng.uniform(0, min(1.0, user.args.think or 0.1)))
+    while time.monotonic() < deadline:
+        await user.rng.choices(actions, weights=weights)[0](user)
+        await user.think()
+
+
+# === RECORDING ===
+class Recorder:
+    """
+    Latencies and status codes per endpoint, counting only requests that started
+    after the warm-up.
+    """
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, label: str, start: float, latency: float, status: int):
+        if start >= self.measure_from:
+            self.latencies[label].append(latency)
+            self.statuses[label][status] += 1
+
+    def error(self, label: str, start: float):
+        if start >= self.measure_from:
+            self.statuses[label]["error"] += 1
+
+
+def load_process(base_url: str, mix: str, first: int, count: int, args) -> tuple[dict, dict]:
+    async def main():
+        started = time.monotonic()
+        recorder = Recorder(time.perf_counter() + args.warmup)
+        deadline = started + args.warmup + args.seconds
+        limits = httpx.Limits(max_connections=count, max_keepalive_connections=count)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            await asyncio.gather(*(
+                virtual_user(VirtualUser(client, i, args, recorder), persona_for(mix, i), deadline)
+                for i in range(first, first + count)
+            ))
+        return dict(recorder.latencies), dict(recorder.statuses)
+    return asyncio.run(main())
+
+
+def summarize(latencies: list[float], statuses: Counter, seconds: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / seconds, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+async def twilio_counts(api_base: str) -> dict:
+    async with httpx.AsyncClient(base_url=api_base) as client:
+        return (await client.get("/stats")).json()
+
+
+async def server_counters(base_url: str) -> Counter:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get("/metrics")
+    totals = Counter()
+    for family in text_string_to_metric_families(response.text):
+        for sample in family.samples:
+            if sample.name in SERVER_COUNTERS:
+                totals[sample.name] += sample.value
+    return totals
+
+
+async def run_mix(mix: str, base_url: str, twilio_base: str, args) -> dict:
+    loop = asyncio.get_running_loop()
+    before, server_before = await twilio_counts(twilio_base), await server_counters(base_url)
+    per_process = max(1, args.users // args.processes)
+    # Load runs in separate processes so generating it does not skew what is measured
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, load_process, base_url, mix, n * per_process, per_process, args)
+            for n in range(args.processes)
+        ))
+    after, server_after = await twilio_counts(twilio_base), await server_counters(base_url)
+
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    for process_latencies, process_statuses in results:
+        for label, values in process_latencies.items():
+            latencies[label].extend(values)
+        for label, counts in process_statuses.items():
+            statuses[label].update(counts)
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "users": per_process * args.processes,
+        "seconds": args.seconds,
+        "endpoints": {label: summarize(latencies[label], statuses[label], args.seconds) for label in sorted(statuses)},
+        "total": summarize(everything, sum(statuses.values(), Counter()), args.seconds),
+        # Sends are asynchronous, so these lag the SOS alerts and voice results slightly
+        "whatsapp_sent": {key: after[key] - before[key] for key in after},
+        # Includes the warm-up
+        "server": {name: round(server_after[name] - server_before[name], 3) for name in SERVER_COUNTERS},
+    }
+
+
+# === REPORTING ===
+def print_mix(mix: str, result: dict):
+    print(f"\n{mix} ({result['users']} users, {result['seconds']:g} s)")
+    print(f"  {'endpoint':<36} {'req':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for label, row in [*result["endpoints"].items(), ("total", result["total"])]:
+        print(f"  {label:<36} {row['requests']:6d} {row['throughput_rps']:8.1f} {row['p50_ms']:9.1f}"
+              f" {row['p95_ms']:9.1f} {row['p99_ms']:9.1f}  {row['statuses']}")
+    print(f"  WhatsApp messages sent by the stub: {result['whatsapp_sent']}")
+    server = result["server"]
+    print(f"  server: {server['db_pool_checkout_wait_seconds_sum']:.2f} s waiting for DB connections,"
+          f" {server['db_query_duration_seconds_sum']:.2f} s in {server['db_query_duration_seconds_count']:.0f} queries,"
+          f" {server['admission_rejected_total']:.0f} shed by admission control")
+
+
+def change(new: float, old: float) -> str:
+    if not old or old != old or new != new:
+        return "     n/a"
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def print_comparison(results: dict, baseline: dict, threshold: float):
+    print(f"\nCompared with {baseline['meta'].get('commit', '?')[:10]}"
+          f" (p95 regressions over {threshold:g}% are marked !)")
+    for mix, result in results["mixes"].items():
+        old_mix = baseline["mixes"].get(mix)
+        if old_mix is None:
+            continue
+        print(f"\n{mix}")
+        print(f"  {'endpoint':<36} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for label, row in [*result["endpoints"].items(), ("total", result["total"])]:
+            old = old_mix["total"] if label == "total" else old_mix["endpoints"].get(label)
+            if old is None:
+                continue
+            p95 = change(row["p95_ms"], old["p95_ms"])
+            flag = " !" if p95.strip() != "n/a" and float(p95.strip("%+ ")) > threshold else ""
+            print(f"  {label:<36} {change(row['throughput_rps'], old['throughput_rps'])}"
+                  f" {change(row['p50_ms'], old['p50_ms'])} {p95} {change(row['p99_ms'], old['p99_ms'])}{flag}")
+
+
+def git_commit() -> dict:
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+async def run(args):
+    await create_schema()
+    await seed(args)
+
+    groq, groq_port = start_stub("stub_groq.py", "--latency", str(args.llm_latency))
+    twilio, twilio_port = start_stub("stub_twilio.py", "--latency", str(args.twilio_latency),
+                                     "--error-rate", str(args.twilio_error_rate))
+    twilio_base = f"http://127.0.0.1:{twilio_port}"
+    env = {
+        **os.environ,
+        "GROQ_URL": f"http://127.0.0.1:{groq_port}/openai/v1/chat/completions",
+        "GROQ_API_KEY": "bench",
+        "NOTIFY_TRANSPORT": "twilio",
+        "TWILIO_API_BASE": twilio_base,
+        "TWILIO_ACCOUNT_SID": "ACbench",
+        "TWILIO_AUTH_TOKEN": "bench",
+        "NOTIFY_BACKOFF_BASE": "0.5",
+        "VOICE_JOBS_MODE": "inline",
+        "UPLOAD_DIR": os.path.join(BENCH_DIR, "uploads"),
+        "ADMISSION_CLIENT_HEADER": "x-forwarded-for",
+        "SLOW_QUERY_MS": "1000000",
+    }
+    results = {
+        "meta": {
+            **git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": engine.dialect.name,
+            "args": vars(args),
+        },
+        "mixes": {},
+    }
+
+    server, base_url = start_app(env)
+    try:
+        await wait_ready(base_url, server)
+        for mix in args.mix:
+            results["mixes"][mix] = await run_mix(mix, base_url, twilio_base, args)
+            print_mix(mix, results["mixes"][mix])
+    finally:
+        for process in (server, groq, twilio):
+            process.terminate()
+            process.wait()
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            print_comparison(results, json.load(baseline), args.threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", nargs="+", choices=[*MIXES, "mixed"], default=[*MIXES, "mixed"])
+    parser.add_argument("--users", type=int, default=50, help="virtual users per mix")
+    parser.add_argument("--seconds", type=float, default=20, help="measured time per mix")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured time before each mix")
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between a user's actions (s)")
+    parser.add_argument("--processes", type=int, default=1, help="load generator processes")
+    parser.add_argument("--incidents", type=int, default=20_000)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--chat-messages", type=int, default=2_000)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--twilio-latency", type=float, default=0.15)
+    parser.add_argument("--twilio-error-rate", type=float, default=0.02)
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="p95 change (%%) flagged as a regression")
+    args = parser.parse_args()
+    if not FIXTURES:
+        sys.exit("No voice fixtures found in uploads/")
+    asyncio.run(run(args))
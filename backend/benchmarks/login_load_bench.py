@@ -0,0 +1,95 @@
+"""
+Login p99 under a login burst, next to the latency of an unrelated endpoint.
+
+Drives the real app in-process (httpx ASGITransport on one event loop) with
+concurrent /login calls while a second client polls GET /chat/. Run it with
+--inline to reproduce the previous behaviour, where bcrypt ran on the event loop.
+
+    python benchmarks/login_load_bench.py --logins 200 --concurrency 50
+"""
+import time
+import asyncio
+import argparse
+from common import create_schema, percentile
+
+import httpx
+import utils
+from database import engine, AsyncSessionLocal
+import models
+
+
+async def inline_verify(plain_password: str, hashed_password: str):
+    # Old behaviour: bcrypt directly inside the async handler
+    return utils.pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def login_burst(client: httpx.AsyncClient, logins: int, concurrency: int, users: int):
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/login", json={"email": f"user{i % users}@example.com", "password": "secret"})
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    return latencies, statuses
+
+
+async def poll(client: httpx.AsyncClient, stop: asyncio.Event, interval: float):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/chat/", params={"limit": 20})
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def summary(name: str, latencies: list[float]) -> str:
+    return (f"{name:<12} n={len(latencies):5d}  p50 {percentile(latencies, 50) * 1000:8.1f}ms"
+            f"  p95 {percentile(latencies, 95) * 1000:8.1f}ms  p99 {percentile(latencies, 99) * 1000:8.1f}ms")
+
+
+async def run(args):
+    await create_schema()
+    password_hash = utils.hash_password("secret")
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            models.User(full_name=f"User {i}", email=f"user{i}@example.com", password=password_hash)
+            for i in range(args.users)
+        ])
+        await db.commit()
+
+    if args.inline:
+        import routes.user_routes
+        routes.user_routes.verify_password_async = inline_verify
+
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll(client, stop, args.poll_interval))
+        start = time.perf_counter()
+        login_latencies, statuses = await login_burst(client, args.logins, args.concurrency, args.users)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        chat_latencies = await poller
+
+    mode = "inline bcrypt" if args.inline else f"offloaded bcrypt ({utils.PASSWORD_HASH_WORKERS} threads)"
+    print(f"{mode}, cost {utils.BCRYPT_ROUNDS}: {args.logins / elapsed:.1f} logins/s, statuses {statuses}")
+    print(summary("POST /login", login_latencies))
+    print(summary("GET /chat/", chat_latencies))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--poll-interval", type=float, default=0.01)
+    parser.add_argument("--inline", action="store_true", help="run bcrypt on the event loop (previous behaviour)")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""
+List-response cost: ORM entities + Pydantic response_model versus column
+projection + orjson, measured through the ASGI stack at 10k and 100k rows.
+
+    python benchmarks/serialization_bench.py --rows 10000 100000
+"""
+import time
+import asyncio
+import argparse
+from typing import List
+from common import create_schema, percentile
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import insert, delete
+from sqlalchemy.future import select
+from database import AsyncSessionLocal, get_db
+from models import Incident, utcnow
+from schemas import IncidentOut
+from projection import columns_for, as_dicts, json_response
+
+app = FastAPI()
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+@app.get("/orm", response_model=List[IncidentOut])
+async def orm_list(db=Depends(get_db)):
+    # The previous list endpoints: hydrate entities, validate and encode through the schema
+    result = await db.execute(select(Incident).order_by(Incident.id))
+    return result.scalars().all()
+
+
+@app.get("/projection", response_model=List[IncidentOut])
+async def projection_list(db=Depends(get_db)):
+    result = await db.execute(select(*columns_for(Incident, IncidentOut)).order_by(Incident.id))
+    return json_response(as_dicts(result.all()))
+
+
+async def seed(rows: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Incident))
+        now = utcnow()
+        for start in range(0, rows, 5000):
+            await db.execute(insert(Incident), [
+                {
+                    "location": f"-26.{i:05d}, 28.{i:05d}",
+                    "description": "He shouted at me and took my phone so I could not call anyone for help.",
+                    "anonymous": i % 3 == 0,
+                    "reporter_email": None if i % 3 == 0 else f"user{i % 500}@example.com",
+                    "status": "pending",
+                    "updated_at": now,
+                }
+                for i in range(start, min(start + 5000, rows))
+            ])
+        await db.commit()
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeats: int, gzip: bool):
+    headers = {"accept-encoding": "gzip" if gzip else "identity"}
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        size = len(response.content) if not gzip else int(response.headers["content-length"])
+    return timings, size
+
+
+async def run(args):
+    await create_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for rows in args.rows:
+            await seed(rows)
+            print(f"--- {rows} rows ---")
+            baseline = None
+            for path in ("/orm", "/projection"):
+                timings, size = await measure(client, path, args.repeats, gzip=False)
+                _, gzip_size = await measure(client, path, 1, gzip=True)
+                p50 = percentile(timings, 50)
+                baseline = baseline or p50
+                print(f"{path:<12} p50 {p50 * 1000:9.1f} ms  x{baseline / p50:4.1f}   "
+                      f"body {size / 1e6:6.2f} MB  gzip {gzip_size / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Cold start of a web worker: time to import the app, time to run its startup
+hooks, and resident memory after each step, measured in fresh interpreters.
+Also reports which heavy optional modules got imported and, with --top, the
+slowest top-level imports from `python -X importtime`.
+
+    python benchmarks/startup_bench.py --repeat 5 --top 10
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import statistics
+import subprocess
+from common import BACKEND_DIR, create_schema
+
+HEAVY_MODULES = ["numpy", "soundfile", "soxr", "librosa", "pydub", "twilio"]
+
+CHILD = f"""
+import sys, json, time, asyncio
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+rss_import = rss_mb()
+
+async def lifespan():
+    begin = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        rss_ready = rss_mb()
+    return ready - begin, rss_ready
+
+startup, rss_ready = asyncio.run(lifespan())
+print(json.dumps({{
+    "import_s": imported - start,
+    "startup_s": startup,
+    "rss_import_mb": rss_import,
+    "rss_ready_mb": rss_ready,
+    "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_child(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list[tuple[float, str]]:
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports of `main` are indented by exactly three spaces
+        if name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(args):
+    asyncio.run(create_schema())
+    base_env = {**os.environ, "NOTIFY_TRANSPORT": "fake"}
+
+    for mode in ("inline", "worker"):
+        env = {**base_env, "VOICE_JOBS_MODE": mode}
+        runs = [run_child(env) for _ in range(args.repeat)]
+        median = {key: statistics.median(run[key] for run in runs)
+                  for key in ("import_s", "startup_s", "rss_import_mb", "rss_ready_mb")}
+        print(f"VOICE_JOBS_MODE={mode:<7} import {median['import_s'] * 1000:7.1f} ms  "
+              f"startup {median['startup_s'] * 1000:6.1f} ms  "
+              f"RSS {median['rss_import_mb']:6.1f} MB imported / {median['rss_ready_mb']:6.1f} MB ready  "
+              f"heavy modules: {', '.join(runs[-1]['heavy']) or 'none'}")
+
+    if args.top:
+        print(f"\nSlowest top-level imports of main:")
+        for seconds, name in slowest_imports(base_env, args.top):
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    main(parser.parse_args())
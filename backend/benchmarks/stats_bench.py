@@ -0,0 +1,92 @@
+"""
+Admin dashboard counts: fetching every incident and counting client-side versus
+reading the daily rollups through /incidents/stats, at growing incident volumes.
+
+    python benchmarks/stats_bench.py --rows 10000 100000
+"""
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from datetime import timedelta
+from common import create_schema, percentile
+
+import httpx
+from sqlalchemy import insert, delete
+from database import AsyncSessionLocal
+from models import Incident, utcnow
+from rollups import rebuild_rollups
+from routes.incident_routes import router
+from fastapi import FastAPI
+
+app = FastAPI()
+app.include_router(router)
+
+STATUSES = ["pending", "in-progress", "resolved"]
+CATEGORIES = ["sexual abuse", "physical abuse", "emotional abuse", "child abuse", None]
+
+
+async def seed(rows: int):
+    rng = random.Random(rows)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Incident))
+        now = utcnow()
+        for start in range(0, rows, 5000):
+            await db.execute(insert(Incident), [
+                {
+                    "location": "Soweto",
+                    "description": "He shouted at me and took my phone so I could not call anyone for help.",
+                    "status": rng.choice(STATUSES),
+                    "predicted_category": rng.choice(CATEGORIES),
+                    "created_at": now - timedelta(days=rng.randrange(365)),
+                    "updated_at": now,
+                }
+                for _ in range(start, min(start + 5000, rows))
+            ])
+        await db.commit()
+        await rebuild_rollups(db)
+
+
+async def full_scan(client: httpx.AsyncClient):
+    # What the dashboard did: download everything, then count
+    incidents = (await client.get("/incidents/classified-incidents")).json()
+    return Counter(incident["status"] for incident in incidents), Counter(
+        incident["predicted_category"] for incident in incidents
+    )
+
+
+async def rollup(client: httpx.AsyncClient):
+    stats = (await client.get("/incidents/stats")).json()
+    return stats["by_status"], stats["by_category"]
+
+
+async def measure(client, fn, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn(client)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run(args):
+    await create_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for rows in args.rows:
+            await seed(rows)
+            scan_status, _ = await full_scan(client)
+            roll_status, _ = await rollup(client)
+            assert dict(scan_status) == roll_status, "rollups disagree with the incidents table"
+            print(f"--- {rows} rows ---")
+            for name, fn in (("full scan", full_scan), ("rollups", rollup)):
+                p50 = percentile(await measure(client, fn, args.repeats), 50)
+                print(f"{name:<10} p50 {p50 * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
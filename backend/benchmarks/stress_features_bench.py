@@ -0,0 +1,110 @@
+"""
+Latency, peak memory and numeric agreement of the streaming stress-feature
+extractor against the previous librosa path (22.05 kHz load + rms + yin).
+
+Runs on the uploads/ fixtures plus synthetic clips of increasing length.
+
+    python benchmarks/stress_features_bench.py --repeat 3
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stress_features import extract_stress_features
+from voice_jobs import stress_level_for
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = ["uploads/sos_recording.wav", "uploads/sos_recording.webm"]
+
+
+def librosa_features(file_path: str) -> dict:
+    # The analysis upload_voice used to run inline
+    import librosa
+
+    y, sr = librosa.load(file_path)
+    energy = float(np.mean(librosa.feature.rms(y=y)))
+    pitch = float(np.mean(librosa.yin(y, fmin=50, fmax=300, sr=sr)))
+    return {"energy": energy, "pitch": pitch}
+
+
+def synthetic_clip(directory: str, seconds: float, pitch: float, amplitude: float, sr: int = 44100) -> str:
+    """
+    Voiced-like signal: harmonic tone with vibrato, short pauses and background noise.
+    """
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * np.cumsum(pitch * (1 + 0.03 * np.sin(2 * np.pi * 5 * t))) / sr
+    tone = np.sin(phase) + 0.4 * np.sin(2 * phase) + 0.2 * np.sin(3 * phase)
+    gate = (np.sin(2 * np.pi * 0.5 * t) > -0.7).astype(np.float64)
+    y = amplitude * tone * gate + 0.003 * rng.standard_normal(len(t))
+    path = os.path.join(directory, f"synthetic_{int(seconds)}s_{int(pitch)}hz.wav")
+    sf.write(path, y.astype(np.float32), sr)
+    return path
+
+
+def measure(fn, file_path: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(file_path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def relative(a: float, b: float) -> float:
+    return abs(a - b) / abs(b) if b else float("nan")
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        clips = [os.path.join(BACKEND_DIR, path) for path in FIXTURES]
+        clips += [
+            synthetic_clip(directory, 5, 140, 0.05),
+            synthetic_clip(directory, 30, 240, 0.2),
+            synthetic_clip(directory, args.long_seconds, 180, 0.1),
+        ]
+
+        header = f"{'clip':<28} {'path':<10} {'time ms':>9} {'peak MB':>8} {'energy':>8} {'pitch Hz':>9} {'level':<16}"
+        print(header)
+        print("-" * len(header))
+        for clip in clips:
+            name = os.path.basename(clip)
+            rows = []
+            for label, fn in (
+                ("librosa", librosa_features),
+                ("stream", lambda p: extract_stress_features(p, max_voiced_frames=0)),
+                ("stream+ES", extract_stress_features),
+            ):
+                try:
+                    result, elapsed, peak = measure(fn, clip, args.repeat)
+                except Exception as e:
+                    print(f"{name:<28} {label:<10} skipped: {type(e).__name__}: {e}")
+                    continue
+                level = stress_level_for(result["energy"], result["pitch"])
+                rows.append((label, result))
+                print(f"{name:<28} {label:<10} {elapsed * 1000:9.1f} {peak / 2**20:8.1f} "
+                      f"{result['energy']:8.4f} {result['pitch']:9.2f} {level:<16}")
+
+            results = dict(rows)
+            if "librosa" in results and "stream" in results:
+                print(f"{'':<28} {'agreement':<10} energy Δ {relative(results['stream']['energy'], results['librosa']['energy']):.1%}"
+                      f", pitch Δ {relative(results['stream']['pitch'], results['librosa']['pitch']):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--long-seconds", type=int, default=300, help="length of the long synthetic clip")
+    run(parser.parse_args())
@@ -0,0 +1,112 @@
+"""
+Local stand-in for the Groq chat-completions API.
+
+Answers classification prompts (single object or JSON array) after a fixed
+latency so outbound client behaviour can be measured offline. Requests with
+"stream": true get the reply as Server-Sent Events, one word per chunk.
+
+    python benchmarks/stub_groq.py --port 8900 --latency 0.2 --token-delay 0.02
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = ["sexual abuse", "physical abuse", "emotional abuse", "child abuse"]
+SUPPORT_REPLY = (
+    "That sounds really hard, and I'm glad you reached out. You don't have to go through this alone. "
+    "If you are in danger right now, please call the GBV Helpline on 0800 428 428 or the police on 10111."
+)
+
+
+def _prediction():
+    return {"category": random.choice(CATEGORIES), "confidence": round(random.uniform(0.5, 1.0), 2)}
+
+
+def _answer(prompt: str) -> str:
+    if "JSON array" in prompt:
+        count = len(re.findall(r"^\s*\d+\. ", prompt, flags=re.MULTILINE))
+        return json.dumps([_prediction() for _ in range(count)])
+    if "JSON object" in prompt:
+        return json.dumps(_prediction())
+    return SUPPORT_REPLY
+
+
+class StubGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True
+    latency = 0.2
+    token_delay = 0.02
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+
+        time.sleep(self.latency)
+
+        if payload.get("stream"):
+            self._stream(_answer(prompt))
+            return
+
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": _answer(prompt)}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, answer: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            delta = word if i == 0 else f" {word}"
+            self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, text: str):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, latency: float = 0.2, token_delay: float = 0.02):
+    """
+    Start the stub in a daemon thread and return (server, url).
+    """
+    handler = type("Handler", (StubGroqHandler,), {"latency": latency, "token_delay": token_delay})
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 128})
+    server = server_class(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+    return server, url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.latency, args.token_delay)
+    print(f"Stub Groq listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,103 @@
+"""
+Local stand-in for the Twilio Messages API.
+
+Accepts POST /2010-04-01/Accounts/<sid>/Messages.json after a fixed latency and
+answers with a fresh message sid, or 503 for a random --error-rate share of
+requests so the outbox retries get exercised. GET /stats returns how many
+messages were accepted and rejected.
+
+    python benchmarks/stub_twilio.py --port 8901 --latency 0.15 --error-rate 0.05
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+MESSAGES_PATH = re.compile(r"^/2010-04-01/Accounts/[^/]+/Messages\.json$")
+
+
+class StubTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.15
+    error_rate = 0.0
+    counts = None  # shared {"accepted": n, "rejected": n}, set per server
+    lock = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if not MESSAGES_PATH.match(self.path):
+            self._json(404, {"message": "Not found"})
+            return
+        if not form.get("To") or not form.get("Body"):
+            self._json(400, {"message": "To and Body are required"})
+            return
+
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._count("rejected")
+            self._json(503, {"message": "Service unavailable"})
+            return
+        number = self._count("accepted")
+        self._json(201, {"sid": f"SM{number:032x}", "status": "queued", "to": form["To"][0]})
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self._json(404, {"message": "Not found"})
+            return
+        with self.lock:
+            self._json(200, dict(self.counts))
+
+    def _count(self, key: str) -> int:
+        with self.lock:
+            self.counts[key] += 1
+            return self.counts[key]
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, latency: float = 0.15, error_rate: float = 0.0):
+    """
+    Start the stub in a daemon thread and return (server, api_base).
+    """
+    handler = type("Handler", (StubTwilioHandler,), {
+        "latency": latency,
+        "error_rate": error_rate,
+        "counts": {"accepted": 0, "rejected": 0},
+        "lock": threading.Lock(),
+    })
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 128})
+    server = server_class(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, api_base = start_stub_server(args.port, args.latency, args.error_rate)
+    print(f"Stub Twilio listening on {api_base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,68 @@
+"""
+Cost of resolving the authenticated user with and without the user cache.
+
+Calls dependancies.get_current_user directly, the same way FastAPI does for
+every authenticated request, and counts the SQL statements it issues.
+
+    DATABASE_URL=postgresql+asyncpg://... python benchmarks/user_cache_bench.py
+"""
+import time
+import asyncio
+import argparse
+from common import create_schema, percentile
+
+from sqlalchemy import event
+from database import engine, AsyncSessionLocal
+import models
+from dependancies import get_current_user
+from user_cache import user_cache
+from utils import create_access_token
+
+
+async def resolve_many(tokens: list[str], requests: int):
+    latencies = []
+    for i in range(requests):
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            await get_current_user(tokens[i % len(tokens)], db)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(args):
+    await create_schema()
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            models.User(full_name=f"User {i}", email=f"user{i}@example.com", password="x")
+            for i in range(args.users)
+        ])
+        await db.commit()
+    tokens = [create_access_token({"sub": f"user{i}@example.com"}) for i in range(args.users)]
+
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+    for label, ttl in (("no cache", 0), ("cache", 60)):
+        user_cache.clear()
+        user_cache.ttl = ttl
+        user_cache.hits = user_cache.misses = 0
+        statements = 0
+        latencies = await resolve_many(tokens, args.requests)
+        total = sum(latencies)
+        print(f"{label:<10} {args.requests / total:9.0f} req/s  p50 {percentile(latencies, 50) * 1e6:7.0f}µs"
+              f"  p99 {percentile(latencies, 99) * 1e6:7.0f}µs  SQL statements {statements:6d}"
+              f"  hits {user_cache.hits} misses {user_cache.misses}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(run(parser.parse_args()))
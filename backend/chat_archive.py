@@ -0,0 +1,425 @@
+"""
+Chat storage lifecycle: monthly partitions, a retention window and a cold archive.
+
+On Postgres `chat_messages` is range-partitioned by month on `created_at`, with
+partitions created a few months ahead and a default partition as a safety net.
+Months that fall entirely outside CHAT_RETENTION_DAYS are written to
+`<CHAT_ARCHIVE_DIR>/chat_messages-YYYY-MM.jsonl.gz` (one JSON message per line,
+oldest first). Then the partition is dropped, or the rows are deleted on other
+databases, and tombstones are recorded for delta-sync clients. Archived months
+stay readable through GET /chat/export.
+
+    python chat_archive.py    # partition the table if needed, create upcoming partitions, archive now
+"""
+import os
+import gzip
+import asyncio
+from uuid import uuid4
+from datetime import datetime, timedelta, timezone
+import orjson
+from sqlalchemy import delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from database import AsyncSessionLocal, engine
+from models import ChatMessage, utcnow
+from sync import record_tombstones
+
+# === CONFIG ===
+# Days of chat kept in the database (0 = keep everything); older whole months are archived
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", 180))
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "archives/chat")
+# Monthly partitions created ahead of the current month (Postgres)
+CHAT_PARTITIONS_AHEAD = int(os.getenv("CHAT_PARTITIONS_AHEAD", 2))
+# Seconds between maintenance runs in the web process (0 = only via `python chat_archive.py`)
+CHAT_MAINTENANCE_INTERVAL = float(os.getenv("CHAT_MAINTENANCE_INTERVAL", 6 * 3600))
+ARCHIVE_BATCH_SIZE = 2000
+
+# Any constant works; it only has to be the same in every worker
+_MAINTENANCE_LOCK_KEY = 0x63686174
+
+
+# === MONTHS ===
+def as_utc(value: datetime | None) -> datetime | None:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def month_start(value: datetime) -> datetime:
+    value = as_utc(value).astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def month_label(month: datetime) -> str:
+    return f"{month.year:04d}-{month.month:02d}"
+
+
+def retention_cutoff(now: datetime | None = None) -> datetime | None:
+    """
+    Start of the oldest month still kept; every month before it is archived.
+    """
+    if CHAT_RETENTION_DAYS <= 0:
+        return None
+    return month_start((now or utcnow()) - timedelta(days=CHAT_RETENTION_DAYS))
+
+
+# === PARTITIONS (Postgres) ===
+def partition_name(month: datetime) -> str:
+    return f"chat_messages_p{month.year:04d}{month.month:02d}"
+
+
+_PARTITIONED_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS chat_messages_id_seq",
+    # The partition key has to be part of the primary key
+    """
+    CREATE TABLE chat_messages (
+        id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+        user_email VARCHAR NOT NULL,
+        content VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id",
+    "CREATE INDEX ix_chat_messages_id ON chat_messages (id)",
+    "CREATE INDEX ix_chat_messages_created_at_id ON chat_messages (created_at, id)",
+    "CREATE INDEX ix_chat_messages_updated_at_id ON chat_messages (updated_at, id)",
+    # Catches rows outside every monthly range instead of failing the insert
+    "CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT",
+]
+
+# An existing plain table is renamed out of the way and copied over
+_UNPARTITIONED_DDL = [
+    "ALTER TABLE chat_messages RENAME TO chat_messages_unpartitioned",
+    "ALTER TABLE chat_messages_unpartitioned RENAME CONSTRAINT chat_messages_pkey TO chat_messages_unpartitioned_pkey",
+    "DROP INDEX IF EXISTS ix_chat_messages_id",
+    "DROP INDEX IF EXISTS ix_chat_messages_created_at_id",
+    "DROP INDEX IF EXISTS ix_chat_messages_updated_at_id",
+    "CREATE SEQUENCE IF NOT EXISTS chat_messages_id_seq",
+    "ALTER SEQUENCE chat_messages_id_seq OWNED BY NONE",
+]
+
+def _copy_unpartitioned(column_types: dict[str, str]) -> list[str]:
+    # column_types: data_type per column of the old table. Older tables store created_at
+    # as a naive UTC timestamp and have no updated_at, which then starts out as created_at
+    created_at = "created_at AT TIME ZONE 'UTC'"
+    if column_types.get("created_at") == "timestamp with time zone":
+        created_at = "created_at"
+    updated_at = f"coalesce({created_at}, now())"
+    if "updated_at" in column_types:
+        updated_at = f"coalesce(updated_at, {created_at}, now())"
+    return [
+        f"""
+        INSERT INTO chat_messages (id, user_email, content, created_at, updated_at)
+        SELECT id, user_email, content, coalesce({created_at}, now()), {updated_at}
+        FROM chat_messages_unpartitioned
+        """,
+        "DROP TABLE chat_messages_unpartitioned",
+        "SELECT setval('chat_messages_id_seq', greatest((SELECT max(id) FROM chat_messages), 1))",
+    ]
+
+
+async def _create_partition(conn, month: datetime):
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF chat_messages "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+    ))
+
+
+async def _create_upcoming_partitions(conn):
+    month = month_start(utcnow())
+    for _ in range(CHAT_PARTITIONS_AHEAD + 1):
+        await _create_partition(conn, month)
+        month = next_month(month)
+
+
+async def ensure_chat_partitions(conn):
+    """
+    Make `chat_messages` partitioned (converting a plain table once) and create
+    the partitions up to CHAT_PARTITIONS_AHEAD months from now. Postgres only;
+    run before create_all, from init_db.py or the CLI, never from web workers.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    # Held until commit, so concurrent deploy steps convert the table only once
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY})
+    relkind = await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('chat_messages')"))
+
+    first = month_start(utcnow())
+    if relkind is None or relkind == "r":
+        convert = relkind == "r"
+        if convert:
+            oldest = await conn.scalar(text("SELECT min(created_at) FROM chat_messages"))
+            if oldest is not None:
+                first = min(first, month_start(oldest))
+            for statement in _UNPARTITIONED_DDL:
+                await conn.execute(text(statement))
+        for statement in _PARTITIONED_DDL:
+            await conn.execute(text(statement))
+        month = first
+        while month <= month_start(utcnow()):
+            await _create_partition(conn, month)
+            month = next_month(month)
+        if convert:
+            result = await conn.execute(text(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'chat_messages_unpartitioned'"
+            ))
+            for statement in _copy_unpartitioned(dict(result.all())):
+                await conn.execute(text(statement))
+            print("Converted chat_messages to a monthly partitioned table")
+
+    await _create_upcoming_partitions(conn)
+
+
+async def create_upcoming_partitions(conn):
+    """
+    Periodic part of ensure_chat_partitions: only adds the coming months' partitions
+    to an already partitioned table. Postgres only.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    # Workers starting together: one creates the partitions, the rest skip this round
+    if not await conn.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY}):
+        return
+    relkind = await conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('chat_messages')"))
+    if relkind != "p":
+        print("chat_messages is not partitioned yet; run python init_db.py")
+        return
+    await _create_upcoming_partitions(conn)
+
+
+async def _partition_exists(db: AsyncSession, month: datetime) -> bool:
+    return await db.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": partition_name(month)})
+
+
+# === ARCHIVE ===
+def archive_path(month: datetime, archive_dir: str = CHAT_ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"chat_messages-{month_label(month)}.jsonl.gz")
+
+
+def archived_months(archive_dir: str = CHAT_ARCHIVE_DIR) -> list[tuple[datetime, str]]:
+    """
+    (month, path) of every archive file, oldest first.
+    """
+    if not os.path.isdir(archive_dir):
+        return []
+    months = []
+    for name in os.listdir(archive_dir):
+        if not (name.startswith("chat_messages-") and name.endswith(".jsonl.gz")):
+            continue
+        try:
+            month = datetime.strptime(name[len("chat_messages-"):-len(".jsonl.gz")], "%Y-%m")
+        except ValueError:
+            continue
+        months.append((month.replace(tzinfo=timezone.utc), os.path.join(archive_dir, name)))
+    return sorted(months)
+
+
+def archive_record(row) -> bytes:
+    return orjson.dumps({
+        "id": row.id,
+        "user_email": row.user_email,
+        "content": row.content,
+        "created_at": as_utc(row.created_at),
+        "updated_at": as_utc(row.updated_at),
+    }) + b"\n"
+
+
+def read_archive(path: str, start: datetime | None = None, end: datetime | None = None, chunk_size: int = 1 << 16):
+    """
+    Decompressed JSON lines of an archive file, in chunks; with `start`/`end`,
+    only the messages created in [start, end).
+    """
+    with gzip.open(path, "rb") as archive:
+        if start is None and end is None:
+            while chunk := archive.read(chunk_size):
+                yield chunk
+            return
+        lines, size = [], 0
+        for line in archive:
+            created_at = datetime.fromisoformat(orjson.loads(line)["created_at"])
+            if (start is None or created_at >= start) and (end is None or created_at < end):
+                lines.append(line)
+                size += len(line)
+                if size >= chunk_size:
+                    yield b"".join(lines)
+                    lines, size = [], 0
+        if lines:
+            yield b"".join(lines)
+
+
+def _read_records(path: str) -> dict[tuple, tuple]:
+    records = {}
+    with gzip.open(path, "rb") as archive:
+        for line in archive:
+            record = orjson.loads(line)
+            created_at = datetime.fromisoformat(record["created_at"])
+            records[record["id"], created_at] = (created_at, record["id"], line)
+    return records
+
+
+class _ArchiveWriter:
+    """
+    Writes to a temporary file next to the archive and renames it into place on
+    close, so readers never see a partial archive and a rerun simply replaces it.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.tmp_path = f"{path}.{uuid4().hex}.tmp"
+        self.file = gzip.open(self.tmp_path, "wb", compresslevel=9)
+
+    def write(self, data: bytes):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+
+async def archive_month(db: AsyncSession, month: datetime, archive_dir: str = CHAT_ARCHIVE_DIR) -> int:
+    """
+    Write one month of chat to its archive file, then remove it from the database
+    and record tombstones, in the caller's transaction. Returns the message count.
+    """
+    end = next_month(month)
+    in_month = (ChatMessage.created_at >= month, ChatMessage.created_at < end)
+    columns = (ChatMessage.id, ChatMessage.user_email, ChatMessage.content, ChatMessage.created_at, ChatMessage.updated_at)
+
+    path = archive_path(month, archive_dir)
+    # A month archived before (a rerun after a failed commit, or a straggler row)
+    # is merged into its file instead of replacing it
+    merged = await asyncio.to_thread(_read_records, path) if os.path.exists(path) else None
+
+    writer = await asyncio.to_thread(_ArchiveWriter, path)
+    ids = []
+    try:
+        result = await db.stream(select(*columns).where(*in_month).order_by(ChatMessage.created_at, ChatMessage.id))
+        async for rows in result.partitions(ARCHIVE_BATCH_SIZE):
+            ids.extend(row.id for row in rows)
+            if merged is None:
+                await asyncio.to_thread(writer.write, b"".join(archive_record(row) for row in rows))
+            else:
+                merged.update({
+                    (row.id, as_utc(row.created_at)): (as_utc(row.created_at), row.id, archive_record(row)) for row in rows
+                })
+        if merged is not None:
+            await asyncio.to_thread(writer.write, b"".join(line for *_, line in sorted(merged.values())))
+    except BaseException:
+        await asyncio.to_thread(writer.discard)
+        raise
+    if ids:
+        await asyncio.to_thread(writer.close)
+    else:
+        await asyncio.to_thread(writer.discard)
+
+    if db.bind.dialect.name == "postgresql" and await _partition_exists(db, month):
+        name = partition_name(month)
+        await db.execute(text(f"ALTER TABLE chat_messages DETACH PARTITION {name}"))
+        await db.execute(text(f"DROP TABLE {name}"))
+    if ids:
+        # Rows the default partition caught, or the whole month outside Postgres
+        await db.execute(delete(ChatMessage).where(*in_month).execution_options(synchronize_session=False))
+        await record_tombstones(db, "chat_message", ids)
+    return len(ids)
+
+
+async def archive_expired(now: datetime | None = None) -> dict[str, int]:
+    """
+    Archive every month older than the retention window, one transaction per month.
+    """
+    cutoff = retention_cutoff(now)
+    if cutoff is None:
+        return {}
+    archived = {}
+    async with AsyncSessionLocal() as db:
+        oldest = await db.scalar(select(func.min(ChatMessage.created_at)))
+        await db.commit()
+    if oldest is None:
+        return archived
+
+    month = month_start(oldest)
+    while month < cutoff:
+        async with AsyncSessionLocal() as db:
+            if db.bind.dialect.name == "postgresql":
+                # Only one worker archives a month; the others skip it
+                if not await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY}):
+                    return archived
+            count = await archive_month(db, month)
+            await db.commit()
+        if count:
+            archived[month_label(month)] = count
+            print(f"Archived {count} chat message(s) from {month_label(month)}")
+        month = next_month(month)
+    return archived
+
+
+_maintenance_lock = asyncio.Lock()
+
+
+async def maintain_chat_storage(convert: bool = False) -> dict[str, int]:
+    """
+    Create upcoming partitions and archive expired months. Only `convert` (the CLI)
+    may also turn a plain chat_messages table into a partitioned one.
+    """
+    # Postgres also serializes workers with an advisory lock; this covers one process on any database
+    async with _maintenance_lock:
+        async with engine.begin() as conn:
+            if convert:
+                await ensure_chat_partitions(conn)
+            else:
+                await create_upcoming_partitions(conn)
+        return await archive_expired()
+
+
+class ChatMaintenance:
+    """
+    Runs maintain_chat_storage every CHAT_MAINTENANCE_INTERVAL seconds in the web process.
+    Schema changes stay in init_db.py; this only adds partitions and archives.
+    """
+
+    def __init__(self, interval: float = CHAT_MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await maintain_chat_storage()
+            except Exception as e:
+                print("Chat maintenance failed:", e)
+            await asyncio.sleep(self.interval)
+
+
+chat_maintenance = ChatMaintenance()
+
+
+if __name__ == "__main__":
+    async def _main():
+        archived = await maintain_chat_storage(convert=True)
+        await engine.dispose()
+        print(f"Chat storage is up to date; archived {sum(archived.values())} message(s)")
+
+    asyncio.run(_main())
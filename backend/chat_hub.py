@@ -0,0 +1,50 @@
+import os
+import asyncio
+
+# Messages buffered per subscriber before it is considered too slow and dropped
+CHAT_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("CHAT_SUBSCRIBER_QUEUE_SIZE", 100))
+
+
+class ChatHub:
+    """
+    In-process fan-out of new chat messages to live subscribers.
+
+    Every subscriber gets a bounded queue. When a queue is full the subscriber is
+    dropped instead of blocking the sender; it receives a final None and is
+    expected to reconnect and catch up with `after_id`.
+    """
+
+    def __init__(self, queue_size: int = CHAT_SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, message: dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        self.dropped += 1
+        # Make room for the sentinel that tells the consumer to disconnect
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+chat_hub = ChatHub()
@@ -0,0 +1,228 @@
+import os
+import json
+import asyncio
+from sqlalchemy.future import select
+from sqlalchemy import or_, update
+from database import AsyncSessionLocal
+from models import Incident
+from collections import Counter
+from rollups import apply_rollups, count_change
+from groq_client import groq_client, GroqClient, MODEL_NAME
+
+
+CATEGORIES = ["sexual abuse", "physical abuse", "emotional abuse", "child abuse"]
+
+# Bump this whenever the prompt, model or category list changes so that
+# previously stored predictions are picked up by reclassify_stale().
+CLASSIFIER_VERSION = f"{MODEL_NAME}:v1"
+
+# Number of descriptions sent to the model in a single batch prompt
+CLASSIFY_BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", 10))
+
+SYSTEM_PROMPT = "You are an AI model that classifies GBV incidents accurately."
+
+
+def _single_prompt(description: str) -> str:
+    return f"""
+        Classify the following incident description into ONE of these categories:
+        {', '.join(CATEGORIES)}.
+
+        Description: "{description}"
+
+        Respond ONLY with a JSON object in this format:
+        {{"category": "<one_of_categories>", "confidence": <0-1 float>}}
+        """
+
+
+def _batch_prompt(descriptions: list[str]) -> str:
+    numbered = "\n".join(f'{i}. "{d}"' for i, d in enumerate(descriptions, start=1))
+    return f"""
+        Classify each of the following incident descriptions into ONE of these categories:
+        {', '.join(CATEGORIES)}.
+
+        Descriptions:
+        {numbered}
+
+        Respond ONLY with a JSON array containing exactly {len(descriptions)} objects,
+        in the same order as the descriptions, each in this format:
+        {{"category": "<one_of_categories>", "confidence": <0-1 float>}}
+        """
+
+
+def _extract_json(message: str, opening: str, closing: str):
+    # Models sometimes wrap the JSON in prose or code fences
+    start, end = message.find(opening), message.rfind(closing)
+    if start == -1 or end == -1:
+        raise ValueError(f"No JSON found in model response: {message!r}")
+    return json.loads(message[start:end + 1])
+
+
+def _parse_prediction(result: dict):
+    category = str(result.get("category", "unknown")).lower()
+    confidence = float(result.get("confidence", 0.0))
+
+    # Ensure category matches our list
+    if category not in CATEGORIES:
+        category = "unknown"
+
+    return category, confidence
+
+
+async def classify_description(description: str, client: GroqClient = groq_client):
+    """
+    Classify one incident description into a GBV category.
+    Returns None if the model could not be reached or answered garbage, so the
+    incident stays unclassified and reclassify_stale() retries it.
+    """
+    try:
+        message = await client.chat_completion([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": _single_prompt(description)},
+        ])
+        return _parse_prediction(_extract_json(message, "{", "}"))
+
+    except Exception as e:
+        print(f"Groq classification error: {e}")
+        return None
+
+
+async def classify_batch(descriptions: list[str], client: GroqClient = groq_client):
+    """
+    Classify several descriptions with one prompt.
+    Falls back to concurrent single requests if the batch answer cannot be parsed;
+    descriptions that still fail come back as None.
+    """
+    if not descriptions:
+        return []
+
+    try:
+        message = await client.chat_completion([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": _batch_prompt(descriptions)},
+        ])
+        results = _extract_json(message, "[", "]")
+        if not isinstance(results, list) or len(results) != len(descriptions):
+            raise ValueError(f"Expected {len(descriptions)} predictions, got {results!r}")
+        return [_parse_prediction(result) for result in results]
+
+    except Exception as e:
+        print(f"Groq batch classification error, retrying individually: {e}")
+        return list(await asyncio.gather(
+            *(classify_description(d, client) for d in descriptions)
+        ))
+
+
+# === BACKGROUND WORKER ===
+# No session is held while the model answers: the rows are read in one short
+# session, and the predictions written back in another under row locks.
+async def _save_predictions(predictions: dict) -> int:
+    # predictions maps incident id -> (category, confidence)
+    if not predictions:
+        return 0
+
+    async with AsyncSessionLocal() as db:
+        # Category moves between rollup rows; lock the incidents so the old values stay current
+        current = await db.execute(
+            select(Incident.id, Incident.created_at, Incident.status, Incident.predicted_category)
+            .where(Incident.id.in_(list(predictions)))
+            .order_by(Incident.id)
+            .with_for_update()
+        )
+        rows = current.all()
+        if not rows:
+            return 0
+
+        changes = Counter()
+        for row in rows:
+            count_change(
+                changes, row.created_at,
+                (row.status, row.predicted_category), (row.status, predictions[row.id][0]),
+            )
+
+        await db.execute(update(Incident), [
+            {
+                "id": row.id,
+                "predicted_category": predictions[row.id][0],
+                "confidence": round(predictions[row.id][1], 2),
+                "classifier_version": CLASSIFIER_VERSION,
+            }
+            for row in rows
+        ])
+        await apply_rollups(db, changes)
+        await db.commit()
+        return len(rows)
+
+
+async def classify_incident(incident_id: int):
+    """
+    Classify a single stored incident and persist the prediction.
+    Runs as a background task after the incident has been committed.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Incident.description).where(Incident.id == incident_id))
+        row = result.one_or_none()
+    if row is None:
+        return
+
+    prediction = await classify_description(row.description or "")
+    if prediction is not None:
+        await _save_predictions({incident_id: prediction})
+
+
+async def _classify_rows(rows, batch_size: int) -> int:
+    # rows are (id, description) pairs; batches are sent concurrently and the
+    # successful predictions written back in one executemany
+    if not rows:
+        return 0
+
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    predictions = await asyncio.gather(
+        *(classify_batch([description or "" for _, description in batch]) for batch in batches)
+    )
+
+    return await _save_predictions({
+        incident_id: prediction
+        for batch, batch_predictions in zip(batches, predictions)
+        for (incident_id, _), prediction in zip(batch, batch_predictions)
+        if prediction is not None
+    })
+
+
+async def classify_incidents(incident_ids: list[int], batch_size: int = CLASSIFY_BATCH_SIZE):
+    """
+    Classify several stored incidents with batched prompts, e.g. after a bulk upload.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Incident.id, Incident.description).where(Incident.id.in_(incident_ids)).order_by(Incident.id)
+        )
+        rows = result.all()
+    return await _classify_rows(rows, batch_size)
+
+
+async def reclassify_stale(batch_size: int = CLASSIFY_BATCH_SIZE):
+    """
+    Reclassify only the incidents whose stored prediction is missing or stale,
+    including those whose earlier classification failed. Batches are sent
+    concurrently; the client bounds the number in flight.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Incident.id, Incident.description).where(
+                or_(
+                    Incident.classifier_version.is_(None),
+                    Incident.classifier_version != CLASSIFIER_VERSION,
+                )
+            ).order_by(Incident.id)
+        )
+        rows = result.all()
+    return await _classify_rows(rows, batch_size)
+
+
+if __name__ == "__main__":
+    async def _main():
+        count = await reclassify_stale()
+        await groq_client.aclose()
+        print(f"Reclassified {count} incident(s) with {CLASSIFIER_VERSION}")
+
+    asyncio.run(_main())
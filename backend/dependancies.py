@@ -2,11 +2,11 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from jose import jwt, JWTError
 import models
 from database import get_db
 from utils import SECRET_KEY, ALGORITHM  # make sure these exist in utils
+from user_cache import get_user_by_email
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -23,8 +23,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(select(models.User).filter(models.User.email == email))
-    user = result.scalars().first()
+    user = await get_user_by_email(db, email)
     if user is None:
         raise credentials_exception
     return user
@@ -0,0 +1,133 @@
+"""
+Geohash helpers for proximity queries on a plain B-tree index.
+
+Each geocoded incident stores a fixed-length geohash; every prefix of it is the
+grid cell containing the point at a coarser precision. A radius search reads the
+3x3 block of cells around the centre (a handful of prefix range scans), trimmed
+to the circle's bounding box, and then filters the candidates by exact distance.
+"""
+import math
+
+GEOHASH_PRECISION = 9  # ~4.8 m x 4.8 m cells
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEGREE = 111_320
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # geohash interleaves bits starting with longitude
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> tuple[float, float, float, float]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) of a geohash cell.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def cell_size_m(precision: int, lat: float = 0.0) -> tuple[float, float]:
+    """
+    (height, width) in metres of a cell at `precision` around latitude `lat`.
+    """
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    height = 180 / 2 ** lat_bits * METERS_PER_DEGREE
+    width = 360 / 2 ** lon_bits * METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+    return height, width
+
+
+def precision_for_radius(radius_m: float, lat: float = 0.0) -> int:
+    """
+    Longest precision whose cells are at least `radius_m` across, so the
+    3x3 block around a point covers the whole circle.
+    """
+    precision = 1
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        if min(cell_size_m(candidate, lat)) < radius_m:
+            break
+        precision = candidate
+    return precision
+
+
+def cover_cells(lat: float, lon: float, radius_m: float) -> list[str]:
+    """
+    Geohash prefixes of the centre cell and its neighbours covering the circle.
+    """
+    precision = precision_for_radius(radius_m, lat)
+    min_lat, max_lat, min_lon, max_lon = decode_bbox(encode(lat, lon, precision))
+    height, width = max_lat - min_lat, max_lon - min_lon
+    center_lat, center_lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+    cells = set()
+    for d_lat in (-1, 0, 1):
+        for d_lon in (-1, 0, 1):
+            cell_lat = center_lat + d_lat * height
+            if not -90 <= cell_lat <= 90:
+                continue
+            cell_lon = (center_lon + d_lon * width + 180) % 360 - 180
+            cells.add(encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> tuple[float, float, list[tuple[float, float]]]:
+    """
+    (min_lat, max_lat, lon_ranges) of the box around the circle. The longitude
+    range is split in two where it crosses the antimeridian.
+    """
+    angle = radius_m / EARTH_RADIUS_M
+    # A hair of slack so points right on the circle are not lost to rounding
+    d_lat = math.degrees(angle) + 1e-9
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90 or math.cos(math.radians(lat)) <= math.sin(angle):
+        # The circle reaches a pole, so every longitude is inside the box
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    d_lon = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat)))) + 1e-9
+    min_lon, max_lon = lon - d_lon, lon + d_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
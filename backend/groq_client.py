@@ -0,0 +1,128 @@
+import os
+import json
+import random
+import asyncio
+import httpx
+from dotenv import load_dotenv
+from metrics import time_external
+
+load_dotenv()
+
+
+# === CONFIG ===
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_URL = os.getenv("GROQ_URL", "https://api.groq.com/openai/v1/chat/completions")
+MODEL_NAME = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", 15))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", 3))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", 8))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", 3))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", 0.5))
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class GroqRetryableError(Exception):
+    pass
+
+
+class GroqClient:
+    """
+    Async chat-completions client with one keep-alive connection pool,
+    bounded concurrency, timeouts and retry with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url: str = GROQ_URL,
+        api_key: str | None = GROQ_API_KEY,
+        model: str = MODEL_NAME,
+        max_concurrency: int = GROQ_MAX_CONCURRENCY,
+        timeout: float = GROQ_TIMEOUT,
+        connect_timeout: float = GROQ_CONNECT_TIMEOUT,
+        max_retries: int = GROQ_MAX_RETRIES,
+        backoff_base: float = GROQ_BACKOFF_BASE,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool belongs to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+
+    async def chat_completion(self, messages: list[dict], **options) -> str:
+        """
+        Send a chat completion request and return the assistant message content.
+        """
+        payload = {"model": self.model, "messages": messages, **options}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    with time_external("groq", "chat_completion"):
+                        response = await self.client.post(self.url, json=payload)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise GroqRetryableError(f"Groq returned {response.status_code}")
+                response.raise_for_status()
+                data = response.json()
+                return data["choices"][0]["message"]["content"].strip()
+            except (httpx.TransportError, GroqRetryableError):
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def stream_chat_completion(self, messages: list[dict], **options):
+        """
+        Stream a chat completion, yielding content deltas as the server sends them.
+        Not retried: a partially delivered answer cannot be replayed transparently.
+        """
+        payload = {"model": self.model, "messages": messages, "stream": True, **options}
+
+        async with self._semaphore:
+            with time_external("groq", "chat_completion_stream"):
+                async with self.client.stream("POST", self.url, json=payload) as response:
+                    if response.status_code in RETRYABLE_STATUS_CODES:
+                        raise GroqRetryableError(f"Groq returned {response.status_code}")
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared client used by the application
+groq_client = GroqClient()
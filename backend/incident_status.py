@@ -0,0 +1,149 @@
+"""
+Incident status vocabulary, allowed transitions and batched status changes.
+
+On Postgres a batch is one UPDATE ... FROM ... RETURNING: a CTE locks the target
+rows (in id order) and supplies their old status, the WHERE clause rejects
+disallowed transitions, and the returned rows become incident_status_history
+entries and rollup deltas in the same transaction.
+"""
+from collections import Counter, defaultdict
+from sqlalchemy import func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models import Incident, IncidentStatusHistory, utcnow
+from rollups import apply_rollups, count_change
+
+PENDING, IN_PROGRESS, RESOLVED, REJECTED = "pending", "in progress", "resolved", "rejected"
+STATUSES = [PENDING, IN_PROGRESS, RESOLVED, REJECTED]
+
+# Spellings the apps have sent in the past
+ALIASES = {"solved": RESOLVED, "dismissed": REJECTED}
+
+# status -> statuses it may move to; closed cases have to be reopened first
+TRANSITIONS = {
+    PENDING: {IN_PROGRESS, RESOLVED, REJECTED},
+    IN_PROGRESS: {PENDING, RESOLVED, REJECTED},
+    RESOLVED: {IN_PROGRESS},
+    REJECTED: {PENDING},
+}
+
+UPDATED, UNCHANGED, INVALID_TRANSITION, NOT_FOUND = "updated", "unchanged", "invalid_transition", "not_found"
+
+
+def normalize_status(value: str | None) -> str | None:
+    """
+    Canonical spelling of a status ("In-Progress" -> "in progress"), or None if unknown.
+    """
+    if not value:
+        return None
+    status = " ".join(value.strip().lower().replace("-", " ").replace("_", " ").split())
+    status = ALIASES.get(status, status)
+    return status if status in TRANSITIONS else None
+
+
+def blocked_sources(new: str) -> list[str]:
+    # Free-text statuses stored before validation existed are never blocked
+    return [status for status in STATUSES if status != new and new not in TRANSITIONS[status]]
+
+
+async def _update_returning_old(db: AsyncSession, incident_ids: list[int], status: str, now) -> dict:
+    old = (
+        select(Incident.id, func.coalesce(Incident.status, PENDING).label("old_status"))
+        .where(Incident.id.in_(incident_ids))
+        .order_by(Incident.id)
+        .with_for_update()
+        .cte("old")
+    )
+    result = await db.execute(
+        update(Incident)
+        .where(Incident.id == old.c.id, old.c.old_status != status, old.c.old_status.not_in(blocked_sources(status)))
+        .values(status=status, updated_at=now)
+        .returning(Incident, old.c.old_status)
+        .execution_options(synchronize_session=False)
+    )
+    return {incident.id: (incident, old_status) for incident, old_status in result.all()}
+
+
+async def _update_by_source(db: AsyncSession, incident_ids: list[int], status: str, now) -> dict:
+    # SQLite's RETURNING cannot see joined tables: read the statuses, then run one
+    # UPDATE per old status, guarded by it so a concurrent change is skipped
+    rows = await db.execute(
+        select(Incident.id, func.coalesce(Incident.status, PENDING)).where(Incident.id.in_(incident_ids))
+    )
+    blocked = blocked_sources(status)
+    by_source = defaultdict(list)
+    for incident_id, old_status in rows:
+        if old_status != status and old_status not in blocked:
+            by_source[old_status].append(incident_id)
+
+    changed = {}
+    for old_status, ids in sorted(by_source.items()):
+        result = await db.execute(
+            update(Incident)
+            .where(Incident.id.in_(ids), func.coalesce(Incident.status, PENDING) == old_status)
+            .values(status=status, updated_at=now)
+            .returning(Incident)
+            .execution_options(synchronize_session=False)
+        )
+        changed.update({incident.id: (incident, old_status) for incident in result.scalars()})
+    return changed
+
+
+async def change_status(db: AsyncSession, incident_ids: list[int], status: str,
+                        changed_by: str | None = None, note: str | None = None) -> list[dict]:
+    """
+    Move the incidents to `status` (already normalized) where the transition is
+    allowed. Returns one result per distinct id in request order; updated ones
+    carry the refreshed Incident. The caller commits.
+    """
+    incident_ids = list(dict.fromkeys(incident_ids))
+    now = utcnow()
+    if db.bind.dialect.name == "postgresql":
+        changed = await _update_returning_old(db, incident_ids, status, now)
+    else:
+        changed = await _update_by_source(db, incident_ids, status, now)
+
+    if changed:
+        await db.execute(insert(IncidentStatusHistory), [
+            {
+                "incident_id": incident.id,
+                "old_status": old_status,
+                "new_status": status,
+                "changed_by": changed_by,
+                "note": note,
+                "changed_at": now,
+            }
+            for incident, old_status in changed.values()
+        ])
+        changes = Counter()
+        for incident, old_status in changed.values():
+            count_change(
+                changes, incident.created_at,
+                (old_status, incident.predicted_category), (status, incident.predicted_category),
+            )
+        await apply_rollups(db, changes)
+
+    # Only a partly applied batch needs to find out why the other ids were skipped
+    current = {}
+    skipped = [incident_id for incident_id in incident_ids if incident_id not in changed]
+    if skipped:
+        rows = await db.execute(select(Incident.id, Incident.status).where(Incident.id.in_(skipped)))
+        current = {row.id: row.status or PENDING for row in rows}
+
+    results = []
+    for incident_id in incident_ids:
+        if incident_id in changed:
+            incident, old_status = changed[incident_id]
+            results.append({"incident_id": incident_id, "result": UPDATED, "old_status": old_status,
+                            "status": status, "incident": incident})
+        elif incident_id not in current:
+            results.append({"incident_id": incident_id, "result": NOT_FOUND, "error": "Incident not found"})
+        elif current[incident_id] == status:
+            results.append({"incident_id": incident_id, "result": UNCHANGED, "old_status": status, "status": status})
+        else:
+            results.append({
+                "incident_id": incident_id, "result": INVALID_TRANSITION,
+                "old_status": current[incident_id], "status": current[incident_id],
+                "error": f"Cannot change status from {current[incident_id]!r} to {status!r}",
+            })
+    return results
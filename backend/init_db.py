@@ -0,0 +1,193 @@
+"""
+One-time schema setup: tables, chat partitions, search index and initial rollups. Idempotent, so
+it is safe to run on every deploy before the web workers start.
+
+create_all only creates missing tables, so columns and constraints added to tables that existing
+deployments already have are brought up to date by the upgrade steps below. Each step looks at
+the live schema first.
+
+    python init_db.py
+"""
+import asyncio
+from sqlalchemy import inspect, text
+from database import engine, Base
+import models  # noqa: F401  (registers the tables)
+from search import ensure_search_index
+from rollups import ensure_rollups
+from chat_archive import ensure_chat_partitions
+
+# === UPGRADES ===
+# Columns added to existing tables. They are added nullable, then tightened to the model's
+# NOT NULL after BACKFILLS has filled the existing rows
+ADDED_COLUMNS = [
+    # Stored classification, offline idempotency, delta sync and coordinates
+    ("incidents", "predicted_category"),
+    ("incidents", "confidence"),
+    ("incidents", "classifier_version"),
+    ("incidents", "idempotency_key"),
+    ("incidents", "updated_at"),
+    ("incidents", "latitude"),
+    ("incidents", "longitude"),
+    ("incidents", "geohash"),
+    ("chat_messages", "updated_at"),
+    ("notifications", "claimed_at"),
+    # Voice analysis jobs (stress_level, energy and pitch became nullable for pending jobs)
+    ("voice_notes", "file_path"),
+    ("voice_notes", "phone"),
+    ("voice_notes", "status"),
+    ("voice_notes", "error"),
+    ("voice_notes", "completed_at"),
+    ("voice_notes", "claimed_at"),
+]
+
+# (table, column) -> SQL value for rows that are still NULL when the column becomes NOT NULL
+BACKFILLS = {
+    ("incidents", "updated_at"): "coalesce(created_at, CURRENT_TIMESTAMP)",
+    ("chat_messages", "created_at"): "CURRENT_TIMESTAMP",
+    ("chat_messages", "updated_at"): "coalesce(created_at, CURRENT_TIMESTAMP)",
+    # Recordings stored before the job queue were analysed during the upload
+    ("voice_notes", "status"): "'done'",
+}
+
+
+def _table_state(sync_conn, name: str):
+    inspector = inspect(sync_conn)
+    if not inspector.has_table(name):
+        return None
+    return {column["name"]: column for column in inspector.get_columns(name)}
+
+
+async def _columns(conn, name: str) -> dict | None:
+    return await conn.run_sync(_table_state, name)
+
+
+async def _add_columns(conn):
+    for name, column_name in ADDED_COLUMNS:
+        columns = await _columns(conn, name)
+        if columns is None or column_name in columns:
+            continue
+        column = Base.metadata.tables[name].c[column_name]
+        await conn.execute(text(
+            f"ALTER TABLE {name} ADD COLUMN {column_name} {column.type.compile(dialect=conn.dialect)}"
+        ))
+        print(f"Added {name}.{column_name}")
+
+
+def _nullability_mismatch(table, columns: dict) -> list:
+    return [
+        column for column in table.columns
+        if column.name in columns and not column.primary_key and column.nullable != columns[column.name]["nullable"]
+    ]
+
+
+async def _rebuild_sqlite_table(conn, table, columns: dict):
+    # SQLite cannot change constraints in place: copy the rows into a fresh table built from the model
+    old = f"{table.name}__old"
+    result = await conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"),
+        {"name": table.name},
+    )
+    for (index,) in result.all():
+        await conn.execute(text(f"DROP INDEX {index}"))
+    await conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+    await conn.run_sync(table.create)
+    shared = ", ".join(column.name for column in table.columns if column.name in columns)
+    await conn.execute(text(f"INSERT INTO {table.name} ({shared}) SELECT {shared} FROM {old}"))
+    await conn.execute(text(f"DROP TABLE {old}"))
+    print(f"Rebuilt {table.name}")
+
+
+async def _match_constraints(conn):
+    for table in Base.metadata.sorted_tables:
+        columns = await _columns(conn, table.name)
+        if columns is None:
+            continue
+        mismatched = _nullability_mismatch(table, columns)
+        for column in mismatched:
+            backfill = BACKFILLS.get((table.name, column.name))
+            if not column.nullable and backfill:
+                await conn.execute(text(
+                    f"UPDATE {table.name} SET {column.name} = {backfill} WHERE {column.name} IS NULL"
+                ))
+        if conn.dialect.name == "postgresql":
+            for column in mismatched:
+                action = "DROP NOT NULL" if column.nullable else "SET NOT NULL"
+                await conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} {action}"))
+            continue
+        if conn.dialect.name != "sqlite":
+            continue
+        autoincrement = table.dialect_options["sqlite"]["autoincrement"]
+        if autoincrement:
+            sql = await conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                    {"name": table.name})
+            autoincrement = "AUTOINCREMENT" not in sql.upper()
+        if not (mismatched or autoincrement):
+            continue
+        missing = [column.name for column in table.columns
+                   if column.name not in columns and not column.nullable and column.server_default is None]
+        if missing:
+            # The copy would fail; the column needs an ADDED_COLUMNS entry (and backfill) first
+            print(f"Cannot rebuild {table.name}: no upgrade step adds {', '.join(missing)}")
+            continue
+        await _rebuild_sqlite_table(conn, table, columns)
+
+
+def _unique_state(sync_conn, name: str) -> set[tuple[str, ...]]:
+    inspector = inspect(sync_conn)
+    unique = {tuple(constraint["column_names"]) for constraint in inspector.get_unique_constraints(name)}
+    unique.update(tuple(index["column_names"]) for index in inspector.get_indexes(name) if index["unique"])
+    return unique
+
+
+async def _add_unique_indexes(conn):
+    # ADD COLUMN cannot carry a UNIQUE constraint; a unique index enforces it (and serves ON CONFLICT)
+    for table in Base.metadata.sorted_tables:
+        if await _columns(conn, table.name) is None:
+            continue
+        enforced = await conn.run_sync(_unique_state, table.name)
+        for column in table.columns:
+            if column.unique and (column.name,) not in enforced:
+                await conn.execute(text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table.name}_{column.name} ON {table.name} ({column.name})"
+                ))
+                print(f"Added unique index on {table.name}.{column.name}")
+
+
+async def _add_indexes(conn):
+    # Model indexes (keyset pagination, job queues, geohash) on tables create_all skipped
+    for table in Base.metadata.sorted_tables:
+        columns = await _columns(conn, table.name)
+        if columns is None:
+            continue
+        for index in table.indexes:
+            if all(column.name in columns for column in index.columns):
+                await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+
+async def upgrade_schema(conn):
+    """
+    Bring tables created by earlier releases up to the current models.
+    """
+    await _add_columns(conn)
+    await _match_constraints(conn)
+    await _add_unique_indexes(conn)
+    await _add_indexes(conn)
+
+
+async def init_db():
+    async with engine.begin() as conn:
+        # Before create_all, which would otherwise make chat_messages a plain table
+        await ensure_chat_partitions(conn)
+        await conn.run_sync(Base.metadata.create_all)
+        await upgrade_schema(conn)
+        await ensure_search_index(conn)
+    await ensure_rollups()
+
+
+if __name__ == "__main__":
+    async def _main():
+        await init_db()
+        await engine.dispose()
+        print("Database schema is up to date")
+
+    asyncio.run(_main())
@@ -1,32 +1,29 @@
-from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base,get_db
-from fastapi.responses import JSONResponse
-from routes import user_routes, auth_routes,incident_routes,chat_routes,chatbot_route
-import uvicorn
-from twilio.rest import Client
+from fastapi.middleware.gzip import GZipMiddleware
+from database import get_sos_db
+from routes import user_routes, auth_routes,incident_routes,chat_routes,chatbot_route,upload_routes,notification_routes,voice_routes
 from pydantic import BaseModel
-import librosa
-import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 import os
-import shutil
-from pydub import AudioSegment
-from models import VoiceNote
+from voice_jobs import voice_jobs, send_stress_alert, VOICE_JOBS_MODE
+from groq_client import groq_client
+from pagination import NEXT_CURSOR_HEADER
+from notifications import dispatcher, enqueue_notification
+from metrics import MetricsMiddleware, metrics_response
+from admission import AdmissionMiddleware
+from chat_archive import chat_maintenance
 
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", 1024))
+# Level 6 costs ~40% less CPU on the event loop than the default 9 for ~3% larger bodies
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", 6))
 
-# Twilio settings
-TWILIO_SID = "ACb96c08ad37433c682164c7e2b651e96a"
-TWILIO_TOKEN = "1d6860dec2f9a69af5f46c24824257c9"
-FROM_WHATSAPP = "whatsapp:+14155238886"  # Twilio Sandbox Number
-TO_WHATSAPP = "whatsapp:+27763951934"     # Recipient number
-
-client = Client(TWILIO_SID, TWILIO_TOKEN)
 app = FastAPI()
 
+# Innermost, so shed requests still get CORS headers and show up in metrics
+app.add_middleware(AdmissionMiddleware)
 # ✅ CORS for React Native / Expo
 app.add_middleware(
     CORSMiddleware,
@@ -34,13 +31,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+# Compress large JSON lists; audio, SSE and partial responses are left alone
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+app.add_middleware(MetricsMiddleware)
 
-# Create DB tables on startup
+# Start background workers; the schema is created once by init_db.py, not on every boot
 @app.on_event("startup")
 async def startup_event():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await dispatcher.start()
+    if VOICE_JOBS_MODE == "inline":
+        await voice_jobs.start(on_complete=send_stress_alert)
+    chat_maintenance.start()
+
+
+# Close shared outbound HTTP pools on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await groq_client.aclose()
+    await chatbot_route.chatbot_client.aclose()
+    await voice_jobs.stop()
+    await dispatcher.stop()
+    await chat_maintenance.stop()
 
 # Include the router
 app.include_router(user_routes.router)
@@ -52,6 +65,9 @@ app.include_router(auth_routes.router)
 app.include_router(incident_routes.router)
 app.include_router(chat_routes.router)
 app.include_router(chatbot_route.router)
+app.include_router(upload_routes.router)
+app.include_router(notification_routes.router)
+app.include_router(voice_routes.router)
 
 
 
@@ -62,89 +78,30 @@ class Location(BaseModel):
     phone:str
     message:str
     
-@app.post("/contact")
-async def sos_alert(location: Location):
+@app.post("/contact", status_code=202)
+async def sos_alert(location: Location, db: AsyncSession = Depends(get_sos_db)):
     print(location.phone)
     latitude = location.latitude
     longitude = location.longitude
     location_url = f"https://www.google.com/maps?q={latitude},{longitude}"
-    account_sid = TWILIO_SID
-    auth_token = TWILIO_TOKEN
 
-    if not account_sid or not auth_token:
-        return {"error": "Twilio credentials not set"}
+    # Delivered by the notification workers; the SOS call returns immediately
+    notification = await enqueue_notification(db, location.phone, f'{location.message}: {location_url}')
+
+    return {"notification_id": notification.id, "status": notification.status}
+
 
-    client = Client(account_sid, auth_token)
 
-    message = client.messages.create(
-        from_='whatsapp:+14155238886',
-        body=f'{location.message}: {location_url}',
-        to='whatsapp:'+location.phone
-        
-    )
 
-    print(location.phone)
 
-    return {"message_sid": message.sid}
-
-
-
-
-
-# ====== ROUTES ======
-@app.post("/upload-voice")
-async def upload_voice(file: UploadFile = File(...), 
-                       phone: str = Form(...),
-                       db: AsyncSession = Depends(get_db)):
-    try:
-        # 1️⃣ Save file locally
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-
-        # 2️⃣ Analyze stress level
-        y, sr = librosa.load(file_path)
-        energy = float(np.mean(librosa.feature.rms(y=y)))
-        pitch = float(np.mean(librosa.yin(y, fmin=50, fmax=300, sr=sr)))
-
-        if energy > 0.03 and pitch > 200:
-            stress_level = "High Stress"
-        elif energy > 0.02:
-            stress_level = "Moderate Stress"
-        else:
-            stress_level = "Low/No Stress"
-
-        # 3️⃣ Store metadata in DB
-        file_url = f"http://localhost:8000/uploads/{file.filename}"  # for your app to fetch later
-        voice_note = VoiceNote(
-            file_name=file.filename,
-            file_url=file_url,
-            stress_level=stress_level,
-            energy=energy,
-            pitch=pitch,
-        )
-        db.add(voice_note)
-        await db.commit()
-        await db.refresh(voice_note)
-
-        # 4️⃣ Send WhatsApp text via Twilio (no media)
-        message = client.messages.create(
-            from_=FROM_WHATSAPP,
-            to=f"whatsapp:{phone}",
-            body=f"🚨 Stress detected!\nLevel: {stress_level}\nEnergy: {energy:.4f}\nPitch: {pitch:.2f} Hz"
-        )
-        print(f"✅ WhatsApp sent: {message.sid}")
-
-        return JSONResponse({
-            "message": "Voice uploaded and analyzed successfully!",
-            "stress_level": stress_level,
-            "file_url": file_url,
-        })
-
-    except Exception as e:
-        print("Error:", e)
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint.
+    """
+    return metrics_response()
 
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
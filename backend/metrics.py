@@ -0,0 +1,195 @@
+"""
+Prometheus metrics: per-route latency, database time per request, connection
+pool pressure and outbound call timing, exported at /metrics.
+"""
+import os
+import time
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.responses import Response
+
+# === CONFIG ===
+# Statements slower than this are logged; SLOW_QUERY_SAMPLE_RATE thins out the log under load
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", 1.0))
+SLOW_QUERY_MAX_CHARS = 500
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# === METRICS ===
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to send the full response", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests currently being handled", ["method"])
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Time spent executing one SQL statement", ["operation"], buckets=QUERY_BUCKETS,
+)
+DB_REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements executed while handling a request", ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_REQUEST_DURATION = Histogram(
+    "db_time_per_request_seconds", "Total SQL execution time while handling a request", ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", buckets=QUERY_BUCKETS,
+)
+DB_POOL_IN_USE = Gauge("db_pool_connections_in_use", "Connections currently checked out of the pool", ["pool"])
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests still being handled", ["priority"])
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests shed by admission control", ["priority", "reason"],
+)
+
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds", "Outbound calls to third-party services and worker pools",
+    ["service", "operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+
+
+# === DATABASE ===
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Set by the middleware; SQLAlchemy runs statements in the caller's context
+_request_db_stats: ContextVar[RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long callers wait for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return verb if verb in ("select", "insert", "update", "delete") else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_DURATION.labels(_operation(statement)).observe(elapsed)
+
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        DB_SLOW_QUERIES.inc()
+        if random.random() < SLOW_QUERY_SAMPLE_RATE:
+            print(f"Slow query ({elapsed * 1000:.1f} ms): {' '.join(statement.split())[:SLOW_QUERY_MAX_CHARS]}")
+
+
+def _handle_error(context):
+    # Keep the timing stack balanced when a statement fails
+    stack = context.connection.info.get("query_start") if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+def instrument_engine(engine, pool: str = "main"):
+    """
+    Attach query timing to an (async) engine and export its pool usage under `pool`.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    if hasattr(sync_engine.pool, "checkedout"):
+        DB_POOL_IN_USE.labels(pool).set_function(sync_engine.pool.checkedout)
+
+
+# === EXTERNAL CALLS ===
+@contextmanager
+def time_external(service: str, operation: str):
+    """
+    Time a call to an external service, labelled "ok" or "error" by how it ended.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_CALL_DURATION.labels(service, operation, outcome).observe(time.perf_counter() - start)
+
+
+# === HTTP ===
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and database usage. The route
+    label is the matched path template, so ids in URLs do not explode cardinality.
+    Timing stops when the last body chunk is sent, before background tasks run.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - start)
+            DB_REQUEST_QUERIES.labels(route).observe(stats.queries)
+            DB_REQUEST_DURATION.labels(route).observe(stats.seconds)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        HTTP_REQUESTS_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.labels(method).dec()
+            record()
+            _request_db_stats.reset(token)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
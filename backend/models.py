@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey,Float
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey,Float, Index
 from sqlalchemy.orm import relationship
 from database import Base
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy.sql import func
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -27,9 +31,70 @@ class Incident(Base):
     anonymous = Column(Boolean, default=False)
     reporter_email = Column(String, nullable=True)
     attachment = Column(String, nullable=True)  
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Python-side default so the day is known before commit (daily rollups)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     status = Column(String,default="pending")
 
+    # Stored LLM classification, filled in by the background classifier
+    predicted_category = Column(String, nullable=True)
+    confidence = Column(Float, nullable=True)
+    classifier_version = Column(String, nullable=True, index=True)
+
+    # Client-generated key for offline-queued reports, so retried uploads are not duplicated
+    idempotency_key = Column(String, nullable=True, unique=True)
+    # Bumped on every change; drives delta sync and collection ETags
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow)
+
+    # Optional coordinates; geohash is derived from them (see geo.py) and backs proximity queries
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)
+
+    # Keyset pagination indexes on (created_at, id), optionally scoped by a filter column
+    __table_args__ = (
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        Index("ix_incidents_reporter_email_created_at_id", "reporter_email", "created_at", "id"),
+        Index("ix_incidents_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_incidents_updated_at_id", "updated_at", "id"),
+        Index("ix_incidents_reporter_email_updated_at_id", "reporter_email", "updated_at", "id"),
+        # Pattern ops so Postgres can use the B-tree for geohash LIKE 'prefix%' scans
+        Index("ix_incidents_geohash", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}),
+    )
+
+
+class IncidentDailyStat(Base):
+    """
+    Incident counts per UTC day, status and category, kept current by rollups.py.
+    """
+    __tablename__ = "incident_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    # "unclassified" until the classifier has stored a category
+    category = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class IncidentStatusHistory(Base):
+    """
+    One row per incident status change, written with the change (incident_status.py).
+    """
+    __tablename__ = "incident_status_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # No foreign key: the audit trail outlives deleted incidents
+    incident_id = Column(Integer, nullable=False)
+    old_status = Column(String, nullable=True)
+    new_status = Column(String, nullable=False)
+    changed_by = Column(String, nullable=True)
+    note = Column(String, nullable=True)
+    changed_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_incident_status_history_incident_id_changed_at", "incident_id", "changed_at"),
+        Index("ix_incident_status_history_changed_at", "changed_at"),
+    )
+
 
 class VoiceNote(Base):
     __tablename__ = "voice_notes"
@@ -37,10 +102,18 @@ class VoiceNote(Base):
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String, nullable=False)
     file_url = Column(String, nullable=False)
-    stress_level = Column(String, nullable=False)
-    energy = Column(Float, nullable=False)
-    pitch = Column(Float, nullable=False)
+    file_path = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    # Analysis job state: pending -> processing -> done | failed
+    status = Column(String, nullable=False, default="pending", index=True)
+    error = Column(String, nullable=True)
+    stress_level = Column(String, nullable=True)
+    energy = Column(Float, nullable=True)
+    pitch = Column(Float, nullable=True)
+    # Lease: when a process moved the job to "processing"; expired leases are claimed again
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
 
 
 
@@ -50,4 +123,60 @@ class ChatMessage(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_email = Column(String, nullable=False)
     content = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    # Partition key on Postgres, where the table is created by chat_archive.py
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_messages_created_at_id", "created_at", "id"),
+        Index("ix_chat_messages_updated_at_id", "updated_at", "id"),
+        # Ids must never be reused once old months are archived (clients poll with after_id)
+        {"sqlite_autoincrement": True},
+    )
+
+
+
+class Notification(Base):
+    """
+    Outbox of outbound WhatsApp alerts, delivered by the notification workers.
+    """
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String, nullable=False, default="whatsapp")
+    recipient = Column(String, nullable=False, index=True)
+    body = Column(String, nullable=False)
+    # Same recipient + body within the dedup window maps to one row
+    dedup_key = Column(String, nullable=True, unique=True)
+    # pending -> sending -> sent | failed (back to pending between retries)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    provider_id = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    # Lease: when a worker moved the row to "sending"; expired leases are claimed again
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_notifications_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class Tombstone(Base):
+    """
+    Ids of deleted rows, so delta-sync clients can drop them from their local copy.
+    """
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # Owner the row was visible to (reporter email for incidents), for scoped syncs
+    scope = Column(String, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_entity_deleted_at", "entity", "deleted_at"),
+    )
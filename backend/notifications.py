@@ -0,0 +1,281 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from database import AsyncSessionLocal
+from models import Notification
+from metrics import time_external
+
+load_dotenv()
+
+# === CONFIG ===
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE", "https://api.twilio.com")
+FROM_WHATSAPP = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")  # Twilio Sandbox Number
+
+NOTIFY_TRANSPORT = os.getenv("NOTIFY_TRANSPORT", "twilio")
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", 2))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 5))
+NOTIFY_BACKOFF_BASE = float(os.getenv("NOTIFY_BACKOFF_BASE", 2))
+NOTIFY_DEDUP_WINDOW = int(os.getenv("NOTIFY_DEDUP_WINDOW", 60))
+NOTIFY_POLL_INTERVAL = float(os.getenv("NOTIFY_POLL_INTERVAL", 5))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", 10))
+# A "sending" row whose claim is older than this is assumed abandoned (crashed process) and retried
+NOTIFY_LEASE = float(os.getenv("NOTIFY_LEASE", NOTIFY_TIMEOUT + 30))
+
+
+class TransportError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# === TRANSPORTS ===
+class Transport:
+    """
+    Delivers one message and returns the provider's message id.
+    Raises TransportError on failure.
+    """
+
+    async def send(self, recipient: str, body: str) -> str:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class TwilioTransport(Transport):
+    """
+    WhatsApp via the Twilio REST API over one reused keep-alive connection pool.
+    """
+
+    def __init__(self, account_sid=TWILIO_ACCOUNT_SID, auth_token=TWILIO_AUTH_TOKEN,
+                 api_base=TWILIO_API_BASE, from_=FROM_WHATSAPP, timeout=NOTIFY_TIMEOUT):
+        self.account_sid = account_sid
+        self.from_ = from_
+        self.client = httpx.AsyncClient(
+            base_url=api_base,
+            auth=(account_sid or "", auth_token or ""),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=NOTIFY_WORKERS, max_keepalive_connections=NOTIFY_WORKERS),
+        )
+        self.configured = bool(account_sid and auth_token)
+
+    async def send(self, recipient: str, body: str) -> str:
+        if not self.configured:
+            raise TransportError("Twilio credentials not set", retryable=False)
+
+        try:
+            with time_external("twilio", "send_whatsapp"):
+                response = await self.client.post(
+                    f"/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+                    data={"From": self.from_, "To": f"whatsapp:{recipient}", "Body": body},
+                )
+        except httpx.TransportError as e:
+            raise TransportError(f"Twilio unreachable: {e}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransportError(f"Twilio returned {response.status_code}")
+        if response.status_code >= 400:
+            raise TransportError(f"Twilio rejected message: {response.text}", retryable=False)
+        return response.json()["sid"]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class FakeTransport(Transport):
+    """
+    In-memory transport for tests and local runs; fails the first `fail_times` sends.
+    """
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.sent: list[tuple[str, str]] = []
+
+    async def send(self, recipient: str, body: str) -> str:
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise TransportError("Fake transport failure")
+        self.sent.append((recipient, body))
+        return f"FAKE{len(self.sent)}"
+
+
+TRANSPORTS = {
+    "twilio": TwilioTransport,
+    "fake": FakeTransport,
+}
+
+
+# === OUTBOX ===
+def dedup_key_for(recipient: str, body: str, window: int = NOTIFY_DEDUP_WINDOW) -> str:
+    bucket = int(time.time() // window) if window > 0 else time.time_ns()
+    return hashlib.sha256(f"{recipient}|{body}|{bucket}".encode()).hexdigest()
+
+
+async def enqueue_notification(db: AsyncSession, recipient: str, body: str, dedup_key: str | None = None) -> Notification:
+    """
+    Store an alert in the outbox and wake the workers. Returns the existing row
+    when the same recipient already got the same message within the dedup window.
+    """
+    key = dedup_key or dedup_key_for(recipient, body)
+    result = await db.execute(select(Notification).where(Notification.dedup_key == key))
+    existing = result.scalar_one_or_none()
+    if existing is not None:
+        return existing
+
+    notification = Notification(recipient=recipient, body=body, dedup_key=key)
+    db.add(notification)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request inserted the same alert first
+        await db.rollback()
+        result = await db.execute(select(Notification).where(Notification.dedup_key == key))
+        return result.scalar_one()
+
+    await db.refresh(notification)
+    dispatcher.wake()
+    return notification
+
+
+class NotificationDispatcher:
+    """
+    Async workers that drain the outbox with retry and exponential backoff.
+    Rows are claimed with a conditional UPDATE that stamps claimed_at, so several
+    workers (or processes) never send the same notification twice. A send is cut
+    off after NOTIFY_TIMEOUT; only rows still "sending" once their NOTIFY_LEASE has
+    run out (the process died mid-send) are claimed again.
+    """
+
+    def __init__(self, workers: int = NOTIFY_WORKERS):
+        self.workers = workers
+        self.transport: Transport | None = None
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, transport: Transport | None = None):
+        self.transport = transport or TRANSPORTS[NOTIFY_TRANSPORT]()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.transport is not None:
+            await self.transport.aclose()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            try:
+                notification = await self._claim()
+            except Exception as e:
+                print("Notification claim error:", e)
+                notification = None
+
+            if notification is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), await self._idle_timeout())
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._deliver(notification)
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            and_(Notification.status == "pending", Notification.next_attempt_at <= now),
+            and_(
+                Notification.status == "sending",
+                or_(Notification.claimed_at.is_(None),
+                    Notification.claimed_at < now - timedelta(seconds=NOTIFY_LEASE)),
+            ),
+        )
+
+    async def _claim(self) -> Notification | None:
+        async with AsyncSessionLocal() as db:
+            now = datetime.now(timezone.utc)
+            result = await db.execute(
+                select(Notification)
+                .where(self._claimable(now))
+                .order_by(Notification.next_attempt_at, Notification.id)
+                .limit(self.workers)
+            )
+            for candidate in result.scalars().all():
+                # Same condition again, so only one claimer wins the row
+                claimed = await db.execute(
+                    update(Notification)
+                    .where(Notification.id == candidate.id, self._claimable(now))
+                    .values(status="sending", attempts=Notification.attempts + 1, claimed_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                if claimed.rowcount == 1:
+                    await db.refresh(candidate)
+                    return candidate
+        return None
+
+    async def _idle_timeout(self) -> float:
+        # Sleep until the next scheduled retry, but never longer than the poll interval
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(func.min(Notification.next_attempt_at)).where(Notification.status == "pending")
+                )
+                next_attempt_at = result.scalar()
+        except Exception:
+            return NOTIFY_POLL_INTERVAL
+        if next_attempt_at is None:
+            return NOTIFY_POLL_INTERVAL
+        if next_attempt_at.tzinfo is None:
+            next_attempt_at = next_attempt_at.replace(tzinfo=timezone.utc)
+        delay = (next_attempt_at - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.01), NOTIFY_POLL_INTERVAL)
+
+    async def _deliver(self, notification: Notification):
+        values = {}
+        try:
+            # Bounded, so the send is over before the lease runs out and another worker retries it
+            provider_id = await asyncio.wait_for(
+                self.transport.send(notification.recipient, notification.body), NOTIFY_TIMEOUT
+            )
+            values = {"status": "sent", "provider_id": provider_id, "sent_at": datetime.now(timezone.utc), "last_error": None}
+            print(f"✅ WhatsApp sent: {provider_id}")
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            values = {"last_error": str(e) or type(e).__name__}
+            if retryable and notification.attempts < NOTIFY_MAX_ATTEMPTS:
+                delay = NOTIFY_BACKOFF_BASE * (2 ** (notification.attempts - 1)) * random.uniform(0.8, 1.2)
+                values.update(status="pending", next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=delay))
+            else:
+                values.update(status="failed")
+            print(f"Notification {notification.id} attempt {notification.attempts} failed:", e)
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Notification)
+                .where(Notification.id == notification.id, Notification.status == "sending",
+                       Notification.claimed_at == notification.claimed_at)
+                .values(**values)
+            )
+            await db.commit()
+        if result.rowcount != 1:
+            print(f"Notification {notification.id}: lease expired before the result was saved")
+
+
+dispatcher = NotificationDispatcher()
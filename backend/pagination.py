@@ -0,0 +1,86 @@
+import os
+import json
+import base64
+from datetime import datetime
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """
+    Common `limit` / `cursor` query parameters for keyset-paginated list endpoints.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset(query, page: PageParams, created_at_column, id_column, descending: bool = True):
+    """
+    Apply `(created_at, id)` keyset pagination to a select().
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    if page.cursor:
+        created_at, row_id = decode_cursor(page.cursor, 2)
+        try:
+            bound = (datetime.fromisoformat(created_at), int(row_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        key = tuple_(created_at_column, id_column)
+        query = query.where(key < bound if descending else key > bound)
+
+    if descending:
+        query = query.order_by(created_at_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_at_column.asc(), id_column.asc())
+    return query.limit(page.limit + 1)
+
+
+def keyset_by_id(query, page: PageParams, id_column):
+    """
+    Same as keyset() for tables without a created_at column, ascending by id.
+    """
+    if page.cursor:
+        (row_id,) = decode_cursor(page.cursor, 1)
+        if not isinstance(row_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(id_column > row_id)
+    return query.order_by(id_column.asc()).limit(page.limit + 1)
+
+
+def finish_page(rows: list, page: PageParams, response: Response, cursor_key) -> list:
+    """
+    Trim the look-ahead row and expose the next cursor as a response header.
+    `cursor_key(row)` returns the tuple the next page should start after.
+    """
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*cursor_key(rows[-1]))
+    return rows
@@ -0,0 +1,32 @@
+"""
+Fast path for list responses: select only the columns an output schema needs
+and encode the resulting rows with orjson, skipping ORM and Pydantic objects.
+"""
+import orjson
+from fastapi import Response
+
+# Headers of the injected Response that must not be copied onto the real one
+_BODY_HEADERS = ("content-length", "content-type")
+
+
+def columns_for(model, schema) -> list:
+    """
+    Model columns backing each field of an output schema, in schema order.
+    """
+    fields = getattr(schema, "model_fields", None) or schema.__fields__
+    return [getattr(model, name) for name in fields]
+
+
+def as_dicts(rows) -> list[dict]:
+    return [row._asdict() for row in rows]
+
+
+def json_response(content, response: Response | None = None) -> Response:
+    """
+    orjson-encoded response carrying any headers already set on the route's
+    injected `response` (pagination cursor, ETag).
+    """
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key not in _BODY_HEADERS}
+    return Response(orjson.dumps(content), media_type="application/json", headers=headers)
@@ -4,7 +4,7 @@ from sqlalchemy.future import select
 from database import get_db
 from models import User
 from schemas import UserLogin, Token
-from utils import verify_password, create_access_token
+from utils import verify_password_async, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -14,8 +14,18 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == user.email))
     db_user = result.scalars().first()
 
-    if not db_user or not verify_password(user.password, db_user.password):
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # End the read transaction so no pooled connection is held while bcrypt runs
+    await db.commit()
+    valid, new_hash = await verify_password_async(user.password, db_user.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # bcrypt cost changed since this password was stored
+        db_user.password = new_hash
+        await db.commit()
+
     token = create_access_token({"sub": db_user.email})
     return {"access_token": token, "token_type": "bearer","email":user.email}
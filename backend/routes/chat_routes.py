@@ -1,23 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func
 from sqlalchemy.future import select
-from database import get_db
-from models import ChatMessage
-from schemas import ChatMessageCreate, ChatMessageOut
+from database import get_db, AsyncSessionLocal
+from models import ChatMessage, Tombstone
+from schemas import ChatArchiveOut, ChatMessageCreate, ChatMessageOut, ChatMessageSync
 from typing import List
+from datetime import datetime
+from pagination import PageParams, keyset, finish_page, MAX_PAGE_SIZE
+from chat_hub import chat_hub
+from sync import collection_etag, not_modified, delta
+from projection import columns_for, as_dicts, json_response
+from chat_archive import (
+    ARCHIVE_BATCH_SIZE, archive_record, archived_months, as_utc, month_label, next_month, read_archive,
+)
+import os
+import asyncio
 
 router = APIRouter(prefix="/chat", tags=["Community Chat"])
 
+
+def serialize_message(chat: ChatMessage) -> dict:
+    return jsonable_encoder({
+        "id": chat.id,
+        "user_email": chat.user_email,
+        "content": chat.content,
+        "created_at": chat.created_at,
+    })
+
+
+# Only the columns ChatMessageOut renders
+CHAT_COLUMNS = columns_for(ChatMessage, ChatMessageOut)
+
+
+def messages_after(after_id: int, limit: int, columns=(ChatMessage,)):
+    return (
+        select(*columns)
+        .where(ChatMessage.id > after_id)
+        .order_by(ChatMessage.id.asc())
+        .limit(limit)
+    )
+
+
 @router.post("/", response_model=ChatMessageOut)
 async def send_message(message: ChatMessageCreate, db: AsyncSession = Depends(get_db)):
     chat = ChatMessage(user_email=message.user_email, content=message.content)
     db.add(chat)
     await db.commit()
     await db.refresh(chat)
+
+    # Push to live WebSocket subscribers
+    chat_hub.publish(serialize_message(chat))
     return chat
 
 @router.get("/", response_model=List[ChatMessageOut])
-async def get_messages(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ChatMessage).order_by(ChatMessage.created_at.asc()))
-    messages = result.scalars().all()
-    return messages
+async def get_messages(
+    request: Request,
+    response: Response,
+    after_id: int | None = Query(None, description="Only messages newer than this id (catch-up after reconnect)"),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    The latest `limit` messages in ascending order.
+    The X-Next-Cursor header points to the page of older messages.
+
+    With `after_id`, returns up to `limit` messages following that id instead;
+    repeat with the last id received until fewer than `limit` come back.
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    # Any insert, edit or delete moves one of these, and each is an index lookup,
+    # so a revalidation never counts the whole table
+    versions = select(
+        func.max(ChatMessage.updated_at),
+        func.max(ChatMessage.id),
+        select(func.max(Tombstone.deleted_at)).where(Tombstone.entity == "chat_message").scalar_subquery(),
+    )
+    etag = await collection_etag(db, versions, request)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    response.headers["ETag"] = etag
+
+    if after_id is not None:
+        result = await db.execute(messages_after(after_id, page.limit, CHAT_COLUMNS))
+        return json_response(as_dicts(result.all()), response)
+
+    query = select(*CHAT_COLUMNS)
+    if created_from:
+        query = query.where(ChatMessage.created_at >= created_from)
+    if created_to:
+        query = query.where(ChatMessage.created_at < created_to)
+
+    result = await db.execute(keyset(query, page, ChatMessage.created_at, ChatMessage.id))
+    messages = finish_page(result.all(), page, response, lambda m: (m.created_at, m.id))
+    return json_response(as_dicts(reversed(messages)), response)
+
+
+@router.get("/sync", response_model=ChatMessageSync)
+async def sync_messages(
+    since: str | None = Query(None, description="next_since token from the previous sync; omit for a full snapshot"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Messages changed since the last sync plus ids of deleted ones.
+    Repeat with `next_since` while `has_more` is true.
+    """
+    changes = await delta(db, select(*CHAT_COLUMNS), "chat_message", since, limit)
+    return json_response({**changes, "items": as_dicts(changes["items"])})
+
+
+@router.get("/archives", response_model=List[ChatArchiveOut])
+async def list_archives():
+    """
+    Months moved out of the database by the retention job (see chat_archive.py).
+    """
+    months = await run_in_threadpool(archived_months)
+    return [
+        {"month": month_label(month), "bytes": await run_in_threadpool(os.path.getsize, path)}
+        for month, path in months
+    ]
+
+
+@router.get("/export")
+async def export_messages(
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+):
+    """
+    Messages created in [created_from, created_to) as JSON lines, oldest first:
+    archived months are read from their files, newer ones from the database.
+    """
+    start, end = as_utc(created_from), as_utc(created_to)
+    archives = [
+        (month, path) for month, path in await run_in_threadpool(archived_months)
+        if (end is None or month < end) and (start is None or next_month(month) > start)
+    ]
+    return StreamingResponse(
+        _export_lines(archives, start, end),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chat_messages.jsonl"'},
+    )
+
+
+async def _export_lines(archives, start: datetime | None, end: datetime | None):
+    live_from = start
+    for month, path in archives:
+        month_end = next_month(month)
+        whole = (start is None or start <= month) and (end is None or month_end <= end)
+        async for chunk in iterate_in_threadpool(read_archive(path, None if whole else start, None if whole else end)):
+            yield chunk
+        live_from = month_end if live_from is None else max(live_from, month_end)
+
+    query = select(ChatMessage.id, ChatMessage.user_email, ChatMessage.content,
+                   ChatMessage.created_at, ChatMessage.updated_at)
+    if live_from is not None:
+        query = query.where(ChatMessage.created_at >= live_from)
+    if end is not None:
+        query = query.where(ChatMessage.created_at < end)
+    # Own session: the response body is streamed after the route has returned
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.order_by(ChatMessage.created_at, ChatMessage.id))
+        async for rows in result.partitions(ARCHIVE_BATCH_SIZE):
+            yield b"".join(archive_record(row) for row in rows)
+
+
+@router.websocket("/ws")
+async def chat_stream(websocket: WebSocket, after_id: int | None = Query(None)):
+    """
+    Live chat feed. Sends missed messages after `after_id` first, then every new message
+    (live messages can arrive out of id order). The server closes with code 1013 when the client falls too far behind; reconnect
+    with the last received id as `after_id`.
+    """
+    await websocket.accept()
+
+    # Subscribe before the catch-up query so nothing committed in between is lost
+    queue = chat_hub.subscribe()
+    # Ids go out of order (assigned at insert, published after commit), so live messages are
+    # deduplicated against what the catch-up sent rather than against the highest id
+    sent = set()
+    try:
+        # Page through the whole gap; the connection is released before each page is sent
+        last_id = after_id
+        page_size = MAX_PAGE_SIZE if after_id is not None else 0
+        while page_size == MAX_PAGE_SIZE:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(messages_after(last_id, MAX_PAGE_SIZE))
+                page = result.scalars().all()
+            for chat in page:
+                await websocket.send_json(serialize_message(chat))
+                sent.add(chat.id)
+                last_id = chat.id
+            page_size = len(page)
+
+        # Clients only listen; reading lets us notice a disconnect promptly
+        receiver = asyncio.create_task(_drain(websocket))
+        try:
+            while True:
+                getter = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver in done:
+                    getter.cancel()
+                    break
+
+                message = getter.result()
+                if message is None:
+                    await websocket.close(code=1013)
+                    break
+                if message["id"] not in sent:
+                    await websocket.send_json(message)
+        finally:
+            receiver.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_hub.unsubscribe(queue)
+
+
+async def _drain(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
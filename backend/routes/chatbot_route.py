@@ -1,18 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
-import requests
+import json
 import random
+import time
+import asyncio
 from dotenv import load_dotenv
+import models
+from dependancies import get_current_user, verify_admin_user
+from groq_client import GroqClient
+from support_intents import IntentRouter
 
 load_dotenv()
 
 router = APIRouter(prefix="/support-chatbot", tags=["Support Chatbot"])
 
 # === CONFIG ===
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
-MODEL_NAME = "llama-3.1-8b-instant"
+# Seconds to wait for a full reply, for the first streamed token, and between tokens
+# before giving up on the model and answering with an encouragement instead
+CHATBOT_TIMEOUT = float(os.getenv("CHATBOT_TIMEOUT", 8))
+CHATBOT_FIRST_TOKEN_TIMEOUT = float(os.getenv("CHATBOT_FIRST_TOKEN_TIMEOUT", 1.5))
+CHATBOT_TOKEN_TIMEOUT = float(os.getenv("CHATBOT_TOKEN_TIMEOUT", 5))
+CHATBOT_CONNECT_TIMEOUT = float(os.getenv("CHATBOT_CONNECT_TIMEOUT", 1))
+# Streams hold a connection for the whole reply, so chat gets its own pool
+# instead of queueing behind background classification on the shared client
+CHATBOT_MAX_CONCURRENCY = int(os.getenv("CHATBOT_MAX_CONCURRENCY", 64))
+CHATBOT_TEMPERATURE = 0.8
 
 # === RESOURCES & RESPONSES ===
 SUPPORT_RESOURCES = {
@@ -31,6 +45,38 @@ ENCOURAGEMENTS = [
     "I can tell this isn’t easy to talk about. You’re doing the right thing.",
 ]
 
+# Built once at import; it only depends on the static resources above
+SYSTEM_PROMPT = f"""
+You are a warm, emotionally intelligent support assistant trained to help people
+who may be experiencing abuse, trauma, or distress.
+You are based in South Africa and understand the local context.
+
+Guidelines:
+- Respond like a kind human being, not a robot.
+- Be natural, empathetic, and conversational.
+- If the message clearly mentions danger, violence, or abuse,
+  include one or two local helplines below at the END of your message.
+- If the message is casual or non-emergency (e.g., “what is an apple?”),
+  just respond like a normal person — don’t mention helplines.
+
+South African Helplines:
+{', '.join([f"{k}: {v}" for k, v in SUPPORT_RESOURCES.items()])}
+
+Example of good tone:
+- “That sounds really painful, but I’m proud you spoke up.”
+- “It’s okay to ask questions — I’m here for you.”
+"""
+
+chatbot_client = GroqClient(
+    max_concurrency=CHATBOT_MAX_CONCURRENCY,
+    timeout=CHATBOT_TOKEN_TIMEOUT,
+    connect_timeout=CHATBOT_CONNECT_TIMEOUT,
+    max_retries=0,
+)
+
+# Answers plain helpline/emergency-number requests without an LLM round trip
+intent_router = IntentRouter(SUPPORT_RESOURCES)
+
 
 # === SCHEMAS ===
 class ChatRequest(BaseModel):
@@ -41,69 +87,114 @@ class ChatResponse(BaseModel):
     reply: str
 
 
-# === CHAT FUNCTION ===
-def generate_supportive_reply(user_message: str):
+# === CHAT FUNCTIONS ===
+def build_messages(user_message: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def fallback_reply() -> str:
+    fallback = random.choice(ENCOURAGEMENTS)
+    return f"{fallback}\nIf you ever need urgent help, you can call {SUPPORT_RESOURCES['GBV Helpline']}."
+
+
+async def generate_supportive_reply(user_message: str) -> str:
     """
     Sends user's message to Groq and generates a warm, human-like supportive response.
+    Falls back to an encouragement when the model is slow or unreachable.
     """
+    routed = intent_router.route(user_message)
+    if routed is not None:
+        return routed.reply
+
+    started_at = time.perf_counter()
     try:
-        system_prompt = f"""
-        You are a warm, emotionally intelligent support assistant trained to help people 
-        who may be experiencing abuse, trauma, or distress. 
-        You are based in South Africa and understand the local context.
-
-        Guidelines:
-        - Respond like a kind human being, not a robot.
-        - Be natural, empathetic, and conversational.
-        - If the message clearly mentions danger, violence, or abuse, 
-          include one or two local helplines below at the END of your message.
-        - If the message is casual or non-emergency (e.g., “what is an apple?”), 
-          just respond like a normal person — don’t mention helplines.
-
-        South African Helplines:
-        {', '.join([f"{k}: {v}" for k, v in SUPPORT_RESOURCES.items()])}
-
-        Example of good tone:
-        - “That sounds really painful, but I’m proud you spoke up.”
-        - “It’s okay to ask questions — I’m here for you.”
-        """
-
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json",
-        }
-
-        payload = {
-            "model": MODEL_NAME,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message},
-            ],
-            "temperature": 0.8,
-        }
-
-        response = requests.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-
-        data = response.json()
-        message = data["choices"][0]["message"]["content"].strip()
-
-        return message
+        reply = await asyncio.wait_for(
+            chatbot_client.chat_completion(build_messages(user_message), temperature=CHATBOT_TEMPERATURE),
+            CHATBOT_TIMEOUT,
+        )
+        intent_router.record_llm_latency(started_at)
+        return reply
+    except Exception as e:
+        print("Support Chatbot Error:", repr(e))
+        return fallback_reply()
+
 
+async def stream_supportive_reply(user_message: str):
+    """
+    Yield {"delta": text} events as tokens arrive, then a final
+    {"done": True, "fallback": bool} event.
+    """
+    routed = intent_router.route(user_message)
+    if routed is not None:
+        yield {"delta": routed.reply}
+        yield {"done": True, "fallback": False, "intent": routed.intent}
+        return
+
+    started_at = time.perf_counter()
+    stream = chatbot_client.stream_chat_completion(build_messages(user_message), temperature=CHATBOT_TEMPERATURE)
+    started = False
+    fallback = False
+    try:
+        while True:
+            timeout = CHATBOT_TOKEN_TIMEOUT if started else CHATBOT_FIRST_TOKEN_TIMEOUT
+            try:
+                delta = await asyncio.wait_for(stream.__anext__(), timeout)
+            except StopAsyncIteration:
+                break
+            started = True
+            yield {"delta": delta}
     except Exception as e:
-        print("Support Chatbot Error:", e)
-        fallback = random.choice(ENCOURAGEMENTS)
-        return f"{fallback}\nIf you ever need urgent help, you can call {SUPPORT_RESOURCES['GBV Helpline']}."
+        print("Support Chatbot Error:", repr(e))
+        # Only substitute a reply when nothing has been shown yet
+        if not started:
+            fallback = True
+            yield {"delta": fallback_reply()}
+    finally:
+        await stream.aclose()
+
+    if not fallback:
+        intent_router.record_llm_latency(started_at)
+    yield {"done": True, "fallback": fallback}
+
 
+async def _sse(events):
+    async for event in events:
+        yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
 
-# === ROUTE ===
+
+# === ROUTES ===
 @router.post("/", response_model=ChatResponse)
 async def chat_with_support_bot(request: ChatRequest):
     """
     Support chatbot that provides comforting and helpful replies.
     """
     try:
-        reply = generate_supportive_reply(request.message)
+        reply = await generate_supportive_reply(request.message)
         return ChatResponse(reply=reply)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/stream")
+async def stream_support_bot(request: ChatRequest):
+    """
+    Same as the chatbot route, but streams the reply as Server-Sent Events
+    so the first words reach the app as soon as the model produces them.
+    """
+    return StreamingResponse(
+        _sse(stream_supportive_reply(request.message)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+async def get_support_bot_stats(current_user: models.User = Depends(get_current_user)):
+    """
+    Local routing counters and estimated LLM time saved (admin only).
+    """
+    verify_admin_user(current_user)
+    return intent_router.stats()
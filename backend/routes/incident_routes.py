@@ -1,200 +1,568 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from database import get_db
-from models import Incident
-from schemas import IncidentCreate, IncidentOut
-import shutil
-import os
-from uuid import uuid4
-from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy.future import select
+from models import Incident, IncidentDailyStat
+from schemas import IncidentOut, BulkIncidentItem, BulkIncidentResponse, IncidentSync
+from storage import storage
+from fastapi import Query, Response, Request
 from sqlalchemy.orm import Session
-from database import get_db
 
+import os
+import json
+import asyncio
 from typing import List
+from datetime import date, datetime
+from pydantic import ValidationError
+from sqlalchemy import insert as insert_, func, literal_column, or_
+from pagination import PageParams, keyset, finish_page, decode_cursor, MAX_PAGE_SIZE
+from sync import collection_etag, not_modified, delta
+from projection import columns_for, as_dicts, json_response
+import geo
+from collections import Counter
+from rollups import apply_rollups, count_change
 
 
 router = APIRouter(prefix="/incidents", tags=["Incidents"])
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 @router.post("/", response_model=IncidentOut)
 async def report_incident(
+    background_tasks: BackgroundTasks,
     location: str = Form(...),
     description: str = Form(...),
     anonymous: bool = Form(False),
     reporter_email: str = Form(None),
+    latitude: float | None = Form(None, ge=-90, le=90),
+    longitude: float | None = Form(None, ge=-180, le=180),
     attachment: UploadFile = File(None),
     db: AsyncSession = Depends(get_db)
 ):
+    coordinates = point_columns(latitude, longitude)
     file_path = None
     if attachment:
-        filename = f"{uuid4().hex}_{attachment.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(attachment.file, buffer)
+        blob = await storage.save(attachment)
+        file_path = storage.url_path(blob.key)
 
     incident = Incident(
         location=location,
         description=description,
         anonymous=anonymous,
         reporter_email=None if anonymous else reporter_email,
-        attachment=file_path
+        attachment=file_path,
+        **coordinates
     )
 
     db.add(incident)
+    await db.flush()
+    changes = Counter()
+    count_change(changes, incident.created_at, None, (incident.status, incident.predicted_category))
+    await apply_rollups(db, changes)
     await db.commit()
     await db.refresh(incident)
+
+    # Classify once at ingest; the dashboard only reads the stored result
+    background_tasks.add_task(classify_incident, incident.id)
     return incident
 
 
+def point_columns(latitude: float | None, longitude: float | None) -> dict:
+    """
+    Coordinate columns of an incident, with the geohash used by proximity queries.
+    """
+    if latitude is None and longitude is None:
+        return {}
+    if latitude is None or longitude is None:
+        raise HTTPException(status_code=422, detail="latitude and longitude must be given together")
+    return {"latitude": latitude, "longitude": longitude, "geohash": geo.encode(latitude, longitude)}
+
+
+BULK_MAX_REPORTS = int(os.getenv("BULK_MAX_REPORTS", 100))
+
+
+def _insert_for(db: AsyncSession):
+    # Dialect insert so conflicting idempotency keys are skipped instead of failing the batch
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return insert_(Incident)
+    return insert(Incident).on_conflict_do_nothing(index_elements=[Incident.idempotency_key])
+
+
+async def _existing_by_key(db: AsyncSession, keys) -> dict[str, Incident]:
+    if not keys:
+        return {}
+    result = await db.execute(select(Incident).where(Incident.idempotency_key.in_(keys)))
+    return {incident.idempotency_key: incident for incident in result.scalars().all()}
+
+
+@router.post("/bulk", response_model=BulkIncidentResponse)
+async def report_incidents_bulk(
+    background_tasks: BackgroundTasks,
+    reports: str = Form(..., description="JSON array of reports, each with a client-generated idempotency_key"),
+    attachments: List[UploadFile] = File(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ingest a batch of offline-queued reports in one multi-row INSERT ... RETURNING.
+    Reports whose idempotency_key was already stored come back as duplicates,
+    so a retried batch never creates the same incident twice.
+    """
+    try:
+        raw_items = json.loads(reports)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=422, detail="reports must be a JSON array")
+    if not isinstance(raw_items, list):
+        raise HTTPException(status_code=422, detail="reports must be a JSON array")
+    if len(raw_items) > BULK_MAX_REPORTS:
+        raise HTTPException(status_code=422, detail=f"At most {BULK_MAX_REPORTS} reports per batch")
+    attachments = attachments or []
+
+    results: list[dict | None] = [None] * len(raw_items)
+    items: dict[int, BulkIncidentItem] = {}
+    points: dict[int, dict] = {}
+    seen: set[str] = set()
+    for index, raw in enumerate(raw_items):
+        if not isinstance(raw, dict):
+            results[index] = _result(index=index, status="error", error="Each report must be a JSON object")
+            continue
+        try:
+            item = BulkIncidentItem(**raw)
+        except ValidationError as e:
+            key = raw.get("idempotency_key")
+            results[index] = _result(
+                index=index, idempotency_key=key if isinstance(key, str) else None, status="error", error=str(e)
+            )
+            continue
+        try:
+            coordinates = point_columns(item.latitude, item.longitude)
+        except HTTPException as e:
+            results[index] = _result(index=index, idempotency_key=item.idempotency_key, status="error", error=e.detail)
+            continue
+        if item.attachment_index is not None and not 0 <= item.attachment_index < len(attachments):
+            results[index] = _result(
+                index=index, idempotency_key=item.idempotency_key, status="error", error="attachment_index out of range"
+            )
+            continue
+        if item.idempotency_key in seen:
+            # Repeated inside the batch: resolved to the first occurrence below
+            results[index] = _result(index=index, idempotency_key=item.idempotency_key, status="duplicate")
+            continue
+        seen.add(item.idempotency_key)
+        items[index] = item
+        points[index] = coordinates
+
+    # Reports that an earlier attempt already stored skip the upload entirely
+    stored = await _existing_by_key(db, [item.idempotency_key for item in items.values()])
+    new_items = {index: item for index, item in items.items() if item.idempotency_key not in stored}
+
+    uploads = await asyncio.gather(
+        *(storage.save(attachments[item.attachment_index]) if item.attachment_index is not None else _no_upload()
+          for item in new_items.values()),
+        return_exceptions=True,
+    )
+
+    rows = []
+    for (index, item), upload in zip(list(new_items.items()), uploads):
+        if isinstance(upload, BaseException):
+            detail = upload.detail if isinstance(upload, HTTPException) else str(upload)
+            results[index] = _result(
+                index=index, idempotency_key=item.idempotency_key, status="error", error=f"Attachment upload failed: {detail}"
+            )
+            del new_items[index]
+            continue
+        rows.append({
+            "idempotency_key": item.idempotency_key,
+            "location": item.location,
+            "description": item.description,
+            "anonymous": item.anonymous,
+            "reporter_email": None if item.anonymous else item.reporter_email,
+            "attachment": storage.url_path(upload.key) if upload else None,
+            "status": "pending",
+            "latitude": None,
+            "longitude": None,
+            "geohash": None,
+            **points[index],
+        })
+
+    created: dict[str, Incident] = {}
+    if rows:
+        result = await db.execute(_insert_for(db).values(rows).returning(Incident))
+        created = {incident.idempotency_key: incident for incident in result.scalars().all()}
+        changes = Counter()
+        for incident in created.values():
+            count_change(changes, incident.created_at, None, (incident.status, incident.predicted_category))
+        await apply_rollups(db, changes)
+        await db.commit()
+
+    # Keys that lost a race with a concurrent retry of the same batch
+    missing = [item.idempotency_key for item in new_items.values() if item.idempotency_key not in created]
+    stored.update(await _existing_by_key(db, missing))
+
+    for index, raw in enumerate(raw_items):
+        if results[index] is not None and results[index]["status"] == "error":
+            continue
+        key = raw["idempotency_key"]
+        if index in new_items and key in created:
+            results[index] = _result(index=index, idempotency_key=key, status="created", incident=created[key])
+        else:
+            incident = created.get(key) or stored.get(key)
+            results[index] = _result(index=index, idempotency_key=key, status="duplicate", incident=incident)
+
+    if created:
+        background_tasks.add_task(classify_incidents, [incident.id for incident in created.values()])
+
+    return {
+        "created": sum(result["status"] == "created" for result in results),
+        "duplicates": sum(result["status"] == "duplicate" for result in results),
+        "failed": sum(result["status"] == "error" for result in results),
+        "results": results,
+    }
+
+
+async def _no_upload():
+    return None
+
+
+def _result(index: int, idempotency_key: str | None = None, status: str = "error", incident: Incident | None = None,
+            error: str | None = None) -> dict:
+    return {"index": index, "idempotency_key": idempotency_key, "status": status, "incident": incident, "error": error}
+
+
+def filter_incidents(query, status: str | None, created_from: datetime | None, created_to: datetime | None):
+    if status:
+        query = query.where(Incident.status == status)
+    if created_from:
+        query = query.where(Incident.created_at >= created_from)
+    if created_to:
+        query = query.where(Incident.created_at < created_to)
+    return query
+
+
+def incident_cursor(incident):
+    return incident.created_at, incident.id
+
+
+# Only the columns IncidentOut renders
+INCIDENT_COLUMNS = columns_for(Incident, IncidentOut)
+
+
+def incident_versions():
+    # Changes whenever a matching row is added, updated or deleted
+    return select(func.count(Incident.id), func.max(Incident.updated_at), func.max(Incident.id))
+
+
 # NEW: GET endpoint to fetch reports for a specific user
 @router.get("/", response_model=List[IncidentOut])
 async def get_user_reports(
+    request: Request,
+    response: Response,
     reporter_email: str = Query(...),
+    status: str | None = Query(None),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db)
 ):
-    result = await db.execute(select(Incident).where(Incident.reporter_email == reporter_email))
-    incidents = result.scalars().all()
-    return incidents
+    """
+    Newest-first reports of one user. Follow the X-Next-Cursor header for older pages.
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    versions = filter_incidents(incident_versions(), status, created_from, created_to)
+    etag = await collection_etag(db, versions.where(Incident.reporter_email == reporter_email), request)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    response.headers["ETag"] = etag
+
+    query = select(*INCIDENT_COLUMNS).where(Incident.reporter_email == reporter_email)
+    query = filter_incidents(query, status, created_from, created_to)
+    result = await db.execute(keyset(query, page, Incident.created_at, Incident.id))
+    incidents = finish_page(result.all(), page, response, incident_cursor)
+    return json_response(as_dicts(incidents), response)
 
 
 @router.get("/all-incidents", response_model=List[IncidentOut])
 async def get_reports(
-  
+    request: Request,
+    response: Response,
+    status: str | None = Query(None),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db)
 ):
-    result = await db.execute(select(Incident))
-    incidents = result.scalars().all()
-    return incidents
+    """
+    Newest-first page of all incidents. Follow the X-Next-Cursor header for older pages.
+    Answers 304 when If-None-Match carries the current ETag.
+    """
+    etag = await collection_etag(db, filter_incidents(incident_versions(), status, created_from, created_to), request)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    response.headers["ETag"] = etag
 
+    query = filter_incidents(select(*INCIDENT_COLUMNS), status, created_from, created_to)
+    result = await db.execute(keyset(query, page, Incident.created_at, Incident.id))
+    incidents = finish_page(result.all(), page, response, incident_cursor)
+    return json_response(as_dicts(incidents), response)
 
 
-from schemas import IncidentOutt
-import os
-import requests
-from dotenv import load_dotenv
 
-load_dotenv()
+@router.get("/sync", response_model=IncidentSync)
+async def sync_incidents(
+    since: str | None = Query(None, description="next_since token from the previous sync; omit for a full snapshot"),
+    reporter_email: str | None = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Incidents changed since the last sync plus ids of deleted ones.
+    Repeat with `next_since` while `has_more` is true.
+    """
+    query = select(*INCIDENT_COLUMNS)
+    if reporter_email:
+        query = query.where(Incident.reporter_email == reporter_email)
+    changes = await delta(db, query, "incident", since, limit, scope=reporter_email)
+    return json_response({**changes, "items": as_dicts(changes["items"])})
 
 
+from schemas import IncidentOutt, IncidentSearchResult, IncidentNearby, Hotspot, IncidentStats
+from classifier import classify_incident, classify_incidents, reclassify_stale
+from search import search_query
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
-MODEL_NAME = "llama-3.1-8b-instant"
 
-CATEGORIES = ["sexual abuse", "physical abuse", "emotional abuse", "child abuse"]
+@router.get("/search", response_model=List[IncidentSearchResult])
+async def search_incidents(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Words to find in descriptions and locations"),
+    status: str | None = Query(None),
+    category: str | None = Query(None, description="Predicted category"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Incidents matching every word of `q`, most relevant first.
+    Follow the X-Next-Cursor header for the next page.
+    """
+    query = search_query(db.bind.dialect.name, q, columns_for(Incident, IncidentOutt))
+    if query is None:
+        return json_response([])
+    if status:
+        query = query.where(Incident.status == status)
+    if category:
+        query = query.where(Incident.predicted_category == category)
+
+    # Relevance order has no stable key to seek on, so the cursor carries an offset
+    offset = 0
+    if page.cursor:
+        (offset,) = decode_cursor(page.cursor, 1)
+        if not isinstance(offset, int) or offset < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    query = query.order_by(literal_column("rank").desc(), Incident.id.desc()).offset(offset).limit(page.limit + 1)
+    result = await db.execute(query)
+    incidents = finish_page(result.all(), page, response, lambda _: (offset + page.limit,))
+    return json_response(as_dicts(incidents), response)
+
+
+NEARBY_MAX_RADIUS_M = float(os.getenv("NEARBY_MAX_RADIUS_M", 50_000))
+
+
+@router.get("/nearby", response_model=List[IncidentNearby])
+async def nearby_incidents(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(1000, gt=0, le=NEARBY_MAX_RADIUS_M, description="Search radius in metres"),
+    status: str | None = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Geocoded incidents within `radius` metres of (lat, lon), closest first.
+    """
+    # Prefix scans over the geohash index find the 3x3 cell block around the point, and
+    # the bounding box keeps only rows near the circle (the block can be far larger);
+    # exact distances then drop the corners, and the limit applies to what is left
+    cells = geo.cover_cells(lat, lon, radius)
+    min_lat, max_lat, lon_ranges = geo.bounding_box(lat, lon, radius)
+    query = select(*columns_for(Incident, IncidentOutt)).where(
+        or_(*(Incident.geohash.like(f"{cell}%") for cell in cells)),
+        Incident.latitude.between(min_lat, max_lat),
+        or_(*(Incident.longitude.between(low, high) for low, high in lon_ranges)),
+    )
+    if status:
+        query = query.where(Incident.status == status)
+    result = await db.execute(query)
+
+    matches = []
+    for row in result.all():
+        distance = geo.haversine_m(lat, lon, row.latitude, row.longitude)
+        if distance <= radius:
+            matches.append({**row._asdict(), "distance_m": round(distance, 1)})
+    matches.sort(key=lambda incident: (incident["distance_m"], incident["id"]))
+    return json_response(matches[:limit])
+
+
+@router.get("/hotspots", response_model=List[Hotspot])
+async def incident_hotspots(
+    precision: int = Query(5, ge=1, le=geo.GEOHASH_PRECISION, description="Geohash length of the grid cells (5 is ~4.9 km)"),
+    status: str | None = Query(None),
+    category: str | None = Query(None, description="Predicted category"),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Geocoded incidents counted per geohash grid cell, busiest cells first.
+    """
+    # Inlined so the SELECT and GROUP BY expressions are identical (bound params would differ)
+    cell = func.substr(Incident.geohash, 1, literal_column(str(precision))).label("geohash")
+    count = func.count(Incident.id).label("count")
+    query = select(cell, count).where(Incident.geohash.is_not(None))
+    query = filter_incidents(query, status, created_from, created_to)
+    if category:
+        query = query.where(Incident.predicted_category == category)
+    result = await db.execute(query.group_by(cell).order_by(count.desc(), cell).limit(limit))
+
+    hotspots = []
+    for row in result.all():
+        min_lat, max_lat, min_lon, max_lon = geo.decode_bbox(row.geohash)
+        hotspots.append({
+            "geohash": row.geohash,
+            "count": row.count,
+            "latitude": (min_lat + max_lat) / 2,
+            "longitude": (min_lon + max_lon) / 2,
+            "bounds": [min_lat, min_lon, max_lat, max_lon],
+        })
+    return json_response(hotspots)
 
 
-def classify_with_groq(description: str):
+@router.get("/stats", response_model=IncidentStats)
+async def incident_stats(
+    day_from: date | None = Query(None, description="First UTC day to include"),
+    day_to: date | None = Query(None, description="Last UTC day to include"),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Send text to Groq model and classify it into a GBV category
+    Incident counts by status, category and day, read from the daily rollups only.
     """
-    try:
-        prompt = f"""
-        Classify the following incident description into ONE of these categories:
-        {', '.join(CATEGORIES)}.
+    def grouped(column):
+        query = select(column, func.sum(IncidentDailyStat.count)).group_by(column).order_by(column)
+        if day_from:
+            query = query.where(IncidentDailyStat.day >= day_from)
+        if day_to:
+            query = query.where(IncidentDailyStat.day <= day_to)
+        return query.having(func.sum(IncidentDailyStat.count) != 0)
+
+    by_status = dict((await db.execute(grouped(IncidentDailyStat.status))).all())
+    by_category = dict((await db.execute(grouped(IncidentDailyStat.category))).all())
+    by_day = (await db.execute(grouped(IncidentDailyStat.day))).all()
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_category": by_category,
+        "by_day": [{"day": day, "count": count} for day, count in by_day],
+    }
 
-        Description: "{description}"
 
-        Respond ONLY with a JSON object in this format:
-        {{"category": "<one_of_categories>", "confidence": <0-1 float>}}
-        """
+@router.get("/classified-incidents", response_model=List[IncidentOutt])
+async def get_classified_incidents(db: Session = Depends(get_db)):
+    """
+    Fetch all incidents with the category stored by the background classifier.
+    """
+    result = await db.execute(select(*columns_for(Incident, IncidentOutt)))
+    incidents = result.all()
+    if not incidents:
+        raise HTTPException(status_code=404, detail="No incidents found")
 
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json",
-        }
+    return json_response(as_dicts(incidents))
 
-        payload = {
-            "model": MODEL_NAME,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are an AI model that classifies GBV incidents accurately.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-        }
 
-        response = requests.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
+@router.post("/reclassify")
+async def reclassify_incidents(background_tasks: BackgroundTasks):
+    """
+    Re-run the classifier on incidents whose stored classifier version is missing or stale.
+    """
+    background_tasks.add_task(reclassify_stale)
+    return {"message": "Reclassification scheduled"}
 
-        message = data["choices"][0]["message"]["content"].strip()
 
-        # Attempt to parse the model response
-        import json
-        result = json.loads(message)
-        category = result.get("category", "unknown").lower()
-        confidence = float(result.get("confidence", 0.0))
+from fastapi import Path
+from models import IncidentStatusHistory
+from schemas import IncidentStatusBatch, IncidentStatusBatchResponse, IncidentStatusHistoryOut
+from incident_status import (
+    STATUSES, UPDATED, UNCHANGED, INVALID_TRANSITION, NOT_FOUND, change_status, normalize_status,
+)
 
-        # Ensure category matches our list
-        if category not in CATEGORIES:
-            category = "unknown"
+STATUS_BATCH_MAX = int(os.getenv("STATUS_BATCH_MAX", 500))
 
-        return category, confidence
 
-    except Exception as e:
-        print(f"Groq classification error: {e}")
-        return "unknown", 0.0
+def valid_status(value: str) -> str:
+    status = normalize_status(value)
+    if status is None:
+        raise HTTPException(status_code=422, detail=f"Unknown status {value!r}; expected one of {STATUSES}")
+    return status
 
 
-@router.get("/classified-incidents", response_model=List[IncidentOutt])
-async def get_classified_incidents(db: Session = Depends(get_db)):
+@router.patch("/status", response_model=IncidentStatusBatchResponse)
+async def update_incident_statuses(batch: IncidentStatusBatch, db: AsyncSession = Depends(get_db)):
     """
-    Fetch all incidents and classify each one using the Groq API (Llama 3.1).
+    Move many incidents to one status in a single UPDATE. Disallowed transitions
+    and unknown ids are reported per incident; the rest are applied together
+    with their status history.
     """
-    result = await db.execute(select(Incident))
-    incidents = result.scalars().all()
-    if not incidents:
-        raise HTTPException(status_code=404, detail="No incidents found")
-
-    classified_incidents = []
-
-    for incident in incidents:
-        desc = incident.description or ""
-        category, confidence = classify_with_groq(desc)
-
-        classified_incidents.append({
-            "id": incident.id,
-            "location": incident.location,
-            "description": incident.description,
-            "anonymous": incident.anonymous,
-            "reporter_email": incident.reporter_email,
-            "attachment": incident.attachment,
-            "created_at": incident.created_at,
-            "status":incident.status,
-            "predicted_category": category,
-            "confidence": round(confidence, 2),
-        })
+    if len(batch.incident_ids) > STATUS_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {STATUS_BATCH_MAX} incidents per request")
+    status = valid_status(batch.status)
 
-    return classified_incidents
+    results = await change_status(db, batch.incident_ids, status, batch.changed_by, batch.note)
+    await db.commit()
 
+    outcomes = Counter(result["result"] for result in results)
+    return {
+        "updated": outcomes[UPDATED],
+        "unchanged": outcomes[UNCHANGED],
+        "failed": outcomes[INVALID_TRANSITION] + outcomes[NOT_FOUND],
+        "results": [{k: v for k, v in result.items() if k != "incident"} for result in results],
+    }
 
-from fastapi import Path
-from sqlalchemy import update
 
 @router.put("/{incident_id}/status", response_model=IncidentOut)
 async def update_incident_status(
     incident_id: int = Path(..., description="ID of the incident to update"),
-    status: str = Form(..., description="New status of the incident"),
+    status: str = Form(..., description="New status: pending, in progress, resolved or rejected"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Update the status of an incident (e.g., pending, resolved, in-progress).
+    Update the status of one incident; 409 if the transition is not allowed.
     """
-    # Fetch the incident
-    result = await db.execute(select(Incident).where(Incident.id == incident_id))
-    incident = result.scalar_one_or_none()
-    if not incident:
+    [result] = await change_status(db, [incident_id], valid_status(status))
+    await db.commit()
+
+    if result["result"] == NOT_FOUND:
         raise HTTPException(status_code=404, detail="Incident not found")
+    if result["result"] == INVALID_TRANSITION:
+        raise HTTPException(status_code=409, detail=result["error"])
+    if result["result"] == UNCHANGED:
+        return (await db.execute(select(Incident).where(Incident.id == incident_id))).scalar_one()
+    return result["incident"]
 
-    # Update status
-    incident.status = status
-    db.add(incident)
-    await db.commit()
-    await db.refresh(incident)
-    return incident
+
+@router.get("/{incident_id}/status-history", response_model=List[IncidentStatusHistoryOut])
+async def incident_status_history(
+    incident_id: int = Path(..., description="ID of the incident"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Status changes of one incident, newest first. Read from the history table only.
+    """
+    result = await db.execute(
+        select(IncidentStatusHistory)
+        .where(IncidentStatusHistory.incident_id == incident_id)
+        .order_by(IncidentStatusHistory.changed_at.desc(), IncidentStatusHistory.id.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
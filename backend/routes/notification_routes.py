@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from database import get_db
+from models import Notification
+from schemas import NotificationOut
+
+router = APIRouter(prefix="/notifications", tags=["Notifications"])
+
+
+@router.get("/{notification_id}", response_model=NotificationOut)
+async def get_notification(notification_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Delivery status of a queued WhatsApp alert.
+    """
+    result = await db.execute(select(Notification).where(Notification.id == notification_id))
+    notification = result.scalar_one_or_none()
+    if notification is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return notification
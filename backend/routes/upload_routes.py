@@ -0,0 +1,87 @@
+import os
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+import models
+from dependancies import get_current_user
+from storage import storage
+from sync import etag_matches
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+# Content-addressed blobs never change, so clients may cache them indefinitely
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+def _in_tmp_dir(path: str) -> bool:
+    # Uploads still being written live here; compared after resolving, since keys
+    # such as "./tmp/<id>" or "blobs/../tmp/<id>" lead there too
+    tmp_dir = getattr(storage, "tmp_dir", None)
+    if tmp_dir is None:
+        return False
+    tmp_dir = os.path.realpath(tmp_dir)
+    return os.path.commonpath([tmp_dir, path]) == tmp_dir
+
+
+@router.get("/{key:path}")
+async def get_upload(
+    key: str,
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Serve a stored upload. Supports Range requests (audio scrubbing) and
+    answers conditional requests with 304 Not Modified.
+    """
+    path = storage.local_path(key)
+    if path is None or _in_tmp_dir(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    content_hash = storage.blob_hash(key)
+    if content_hash:
+        # Strong validator straight from the content address
+        etag = f'"{content_hash}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+        cache_control = REVALIDATE_CACHE_CONTROL
+
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+    }
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse handles Range/If-Range and uses the ASGI pathsend
+    # extension (zero-copy sendfile) when the server provides it
+    return FileResponse(path, stat_result=stat_result, headers=headers)
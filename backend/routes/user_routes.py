@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from database import get_db
-from utils import verify_password, create_access_token, hash_password
+from utils import verify_password_async, create_access_token, hash_password_async
 import models, schemas
 from schemas import UserLogin, Token
 from typing import List
+from pagination import PageParams, keyset_by_id, finish_page
 from fastapi.security import OAuth2PasswordBearer
 from dependancies import get_current_user,verify_admin_user  # fetch user from token
+from user_cache import user_cache
+from projection import columns_for, as_dicts, json_response
 
 
 router = APIRouter()
@@ -24,10 +27,14 @@ async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    # Release the connection while bcrypt runs
+    await db.commit()
+    password_hash = await hash_password_async(user.password)
+
     new_user = models.User(
         full_name=user.full_name,
         email=user.email,
-        password=hash_password(user.password)
+        password=password_hash
     )
     db.add(new_user)
     await db.commit()
@@ -40,8 +47,18 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.User).filter(models.User.email == user.email))
     db_user = result.scalars().first()
 
-    if not db_user or not verify_password(user.password, db_user.password):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    # End the read transaction so no pooled connection is held while bcrypt runs
+    await db.commit()
+    valid, new_hash = await verify_password_async(user.password, db_user.password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # bcrypt cost changed since this password was stored
+        db_user.password = new_hash
+        await db.commit()
 
     token = create_access_token({"sub": db_user.email})
     return {"access_token": token, "token_type": "bearer", "user_type": db_user.type,"email":db_user.email}
@@ -54,14 +71,17 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
 # Get all active users (admin only)
 @router.get("/active", response_model=List[schemas.UserOut])
 async def get_active_users(
+    response: Response,
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
 
 ):
-   
-
-    result = await db.execute(select(models.User))
-    users = result.scalars().all()
-    return users
+    # Users have no created_at, so they are paged by id alone.
+    # Only UserOut's columns are selected, so password hashes are never loaded.
+    query = select(*columns_for(models.User, schemas.UserOut))
+    result = await db.execute(keyset_by_id(query, page, models.User.id))
+    users = finish_page(result.all(), page, response, lambda u: (u.id,))
+    return json_response(as_dicts(users), response)
 
 
 # Update user by ID (admin only)
@@ -79,6 +99,7 @@ async def update_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    old_email = user.email
     if user_update.full_name:
         user.full_name = user_update.full_name
     if user_update.email:
@@ -91,6 +112,9 @@ async def update_user(
     db.add(user)
     await db.commit()
     await db.refresh(user)
+
+    # Tokens are keyed by email, so drop both the old and the new subject
+    user_cache.invalidate(old_email, user.email)
     return user
 
 
@@ -111,4 +135,14 @@ async def delete_user(
 
     await db.delete(user)
     await db.commit()
+    user_cache.invalidate(user.email)
     return
+
+
+@router.get("/users/cache-stats")
+async def get_user_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """
+    Hit/miss counters of the authenticated-user cache (admin only).
+    """
+    verify_admin_user(current_user)
+    return user_cache.stats()
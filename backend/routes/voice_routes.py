@@ -0,0 +1,66 @@
+import os
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from database import get_db, get_sos_db
+from models import VoiceNote
+from schemas import VoiceNoteOut
+from storage import storage
+from voice_jobs import voice_jobs
+
+# Base URL the app uses to fetch stored uploads
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+
+router = APIRouter(prefix="/upload-voice", tags=["Voice"])
+
+
+@router.post("", status_code=202)
+async def upload_voice(file: UploadFile = File(...),
+                       phone: str = Form(...),
+                       db: AsyncSession = Depends(get_sos_db)):
+    try:
+        # 1️⃣ Stream the recording to content-addressed storage
+        blob = await storage.save(file)
+
+        # 2️⃣ Store metadata in DB; analysis runs as a background job
+        file_url = f"{PUBLIC_BASE_URL}/{storage.url_path(blob.key)}"  # for your app to fetch later
+        voice_note = VoiceNote(
+            file_name=file.filename,
+            file_url=file_url,
+            file_path=storage.local_path(blob.key),
+            phone=phone,
+            status="pending",
+        )
+        db.add(voice_note)
+        await db.commit()
+        await db.refresh(voice_note)
+
+        # 3️⃣ Queue stress analysis; the WhatsApp alert is sent when it completes
+        voice_jobs.submit(voice_note.id)
+
+        return JSONResponse({
+            "message": "Voice uploaded, analysis queued",
+            "job_id": voice_note.id,
+            "status": voice_note.status,
+            "status_url": f"/upload-voice/{voice_note.id}",
+            "file_url": file_url,
+        }, status_code=202)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("Error:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{job_id}", response_model=VoiceNoteOut)
+async def voice_job_status(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Status and, once done, the result of a voice stress analysis job.
+    """
+    result = await db.execute(select(VoiceNote).where(VoiceNote.id == job_id))
+    voice_note = result.scalar_one_or_none()
+    if voice_note is None:
+        raise HTTPException(status_code=404, detail="Voice job not found")
+    return voice_note
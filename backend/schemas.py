@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Optional
 
 
 
@@ -41,7 +41,7 @@ class Token(BaseModel):
 
 
 
-from datetime import datetime
+from datetime import date, datetime
 
 class IncidentCreate(BaseModel):
     location: str
@@ -57,13 +57,90 @@ class IncidentOut(BaseModel):
     reporter_email: Optional[str]
     attachment: Optional[str]
     created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
     status:str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     class Config:
         orm_mode = True
 
 
 
+class BulkIncidentItem(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=128)
+    location: str
+    description: str
+    anonymous: bool = False
+    reporter_email: Optional[str] = None
+    # Position of this report's file in the request's `attachments` list
+    attachment_index: Optional[int] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+
+class BulkIncidentResult(BaseModel):
+    index: int
+    idempotency_key: Optional[str] = None
+    # created | duplicate | error
+    status: str
+    incident: Optional[IncidentOut] = None
+    error: Optional[str] = None
+
+
+class BulkIncidentResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[BulkIncidentResult]
+
+
+class IncidentStatusBatch(BaseModel):
+    incident_ids: List[int] = Field(..., min_length=1)
+    status: str
+    changed_by: Optional[str] = None
+    note: Optional[str] = Field(None, max_length=1000)
+
+
+class IncidentStatusResult(BaseModel):
+    incident_id: int
+    # updated | unchanged | invalid_transition | not_found
+    result: str
+    old_status: Optional[str] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class IncidentStatusBatchResponse(BaseModel):
+    updated: int
+    unchanged: int
+    failed: int
+    results: List[IncidentStatusResult]
+
+
+class IncidentStatusHistoryOut(BaseModel):
+    id: int
+    incident_id: int
+    old_status: Optional[str] = None
+    new_status: str
+    changed_by: Optional[str] = None
+    note: Optional[str] = None
+    changed_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+
+class IncidentSync(BaseModel):
+    items: List[IncidentOut]
+    deleted: List[int]
+    # Pass back as ?since= on the next sync
+    next_since: str
+    has_more: bool
+
+
+
 class IncidentOutt(BaseModel):
     id: int
     location: str
@@ -75,11 +152,47 @@ class IncidentOutt(BaseModel):
     predicted_category: Optional[str] = None
     confidence: Optional[float] = None
     status:str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     class Config:
         orm_mode = True
 
 
+class IncidentSearchResult(IncidentOutt):
+    # Higher is more relevant
+    rank: float
+
+
+class IncidentNearby(IncidentOutt):
+    # Great-circle distance from the query point
+    distance_m: float
+
+
+class Hotspot(BaseModel):
+    geohash: str
+    count: int
+    # Centre of the grid cell
+    latitude: float
+    longitude: float
+    # [min_lat, min_lon, max_lat, max_lon] of the cell
+    bounds: List[float]
+
+
+
+class DailyCount(BaseModel):
+    day: date
+    count: int
+
+
+class IncidentStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_category: Dict[str, int]
+    # Oldest day first; days without incidents are omitted
+    by_day: List[DailyCount]
+
+
 
 class ChatMessageCreate(BaseModel):
     user_email: EmailStr
@@ -90,9 +203,53 @@ class ChatMessageOut(BaseModel):
     user_email: EmailStr
     content: str
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
 
+class ChatArchiveOut(BaseModel):
+    # YYYY-MM
+    month: str
+    bytes: int
+
+
+class ChatMessageSync(BaseModel):
+    items: List[ChatMessageOut]
+    deleted: List[int]
+    # Pass back as ?since= on the next sync
+    next_since: str
+    has_more: bool
+
+
 
+class VoiceNoteOut(BaseModel):
+    id: int
+    file_name: str
+    file_url: str
+    status: str
+    error: Optional[str] = None
+    stress_level: Optional[str] = None
+    energy: Optional[float] = None
+    pitch: Optional[float] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+
+class NotificationOut(BaseModel):
+    id: int
+    recipient: str
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    provider_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
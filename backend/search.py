@@ -0,0 +1,104 @@
+"""
+Full-text search over incident descriptions and locations.
+
+Postgres keeps a generated, GIN-indexed `tsvector` column on `incidents`;
+SQLite (local runs) gets an FTS5 table maintained by triggers. Both rank matches
+with descriptions weighted above locations, highest score first.
+"""
+import os
+import re
+from sqlalchemy import cast, column, func, literal_column, table, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.future import select
+from models import Incident
+
+# Text search configuration (stemming language) for Postgres
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english")
+# Relative weight of location matches against description matches
+LOCATION_WEIGHT = 0.4
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_POSTGRES_DDL = [
+    f"""
+    ALTER TABLE incidents ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(location, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_incidents_search_vector ON incidents USING GIN (search_vector)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS incidents_fts USING fts5(
+        description, location, content='incidents', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS incidents_fts_insert AFTER INSERT ON incidents BEGIN
+        INSERT INTO incidents_fts(rowid, description, location) VALUES (new.id, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS incidents_fts_delete AFTER DELETE ON incidents BEGIN
+        INSERT INTO incidents_fts(incidents_fts, rowid, description, location)
+        VALUES ('delete', old.id, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS incidents_fts_update AFTER UPDATE OF description, location ON incidents BEGIN
+        INSERT INTO incidents_fts(incidents_fts, rowid, description, location)
+        VALUES ('delete', old.id, old.description, old.location);
+        INSERT INTO incidents_fts(rowid, description, location) VALUES (new.id, new.description, new.location);
+    END
+    """,
+]
+
+
+async def ensure_search_index(conn):
+    """
+    Create the search column/index (Postgres) or FTS table and triggers (SQLite)
+    if missing. Idempotent; run after the tables exist.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            await conn.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = await conn.scalar(text("SELECT 1 FROM sqlite_master WHERE name = 'incidents_fts'"))
+        for statement in _SQLITE_DDL:
+            await conn.execute(text(statement))
+        if not exists:
+            # Index rows that were stored before the FTS table existed
+            await conn.execute(text("INSERT INTO incidents_fts(incidents_fts) VALUES ('rebuild')"))
+
+
+def search_query(dialect: str, terms: str, columns):
+    """
+    select() of `columns` plus a `rank` column for incidents matching every word
+    in `terms`, or None when `terms` has no searchable words.
+    """
+    words = _WORD.findall(terms)
+    if not words:
+        return None
+
+    if dialect == "postgresql":
+        vector = literal_column("incidents.search_vector")
+        query_vector = func.plainto_tsquery(cast(SEARCH_CONFIG, REGCONFIG), " ".join(words))
+        rank = func.ts_rank_cd(vector, query_vector)
+        return select(*columns, rank.label("rank")).where(vector.op("@@")(query_vector))
+
+    if dialect == "sqlite":
+        fts = table("incidents_fts", column("rowid"))
+        # Quoted words are matched literally (implicit AND), so user input cannot inject FTS syntax
+        match = " ".join(f'"{word}"' for word in words)
+        rank = -func.bm25(literal_column("incidents_fts"), 1.0, LOCATION_WEIGHT)
+        return (
+            select(*columns, rank.label("rank"))
+            .join_from(Incident, fts, fts.c.rowid == Incident.id)
+            .where(literal_column("incidents_fts").op("MATCH")(match))
+        )
+
+    raise NotImplementedError(f"Full-text search is not supported on {dialect}")
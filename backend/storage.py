@@ -0,0 +1,141 @@
+import os
+import re
+import hashlib
+from uuid import uuid4
+from dataclasses import dataclass
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+# === CONFIG ===
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+_BLOB_KEY = re.compile(r"^blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9]{1,10})?$")
+
+
+@dataclass
+class StoredBlob:
+    key: str
+    sha256: str
+    size: int
+    filename: str | None
+    content_type: str | None
+    # False when identical content was already stored and the upload was deduplicated
+    created: bool
+
+
+def extension_for(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXTENSION.match(ext) else ""
+
+
+class StorageBackend:
+    """
+    Content-addressed blob storage. Blobs are keyed by the SHA-256 of their
+    content, so repeated uploads of the same file are stored once.
+    """
+
+    def blob_key(self, sha256: str, ext: str) -> str:
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+    def blob_hash(self, key: str) -> str | None:
+        """
+        Content hash encoded in a blob key, or None for keys that are not content-addressed.
+        """
+        match = _BLOB_KEY.match(key)
+        return match.group(1) if match else None
+
+    async def save(self, upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredBlob:
+        raise NotImplementedError
+
+    def url_path(self, key: str) -> str:
+        """
+        Path clients use to fetch the blob, relative to the API base URL.
+        """
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> str | None:
+        """
+        Filesystem path for workers that need to read the blob, if the backend has one.
+        """
+        return None
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    async def save(self, upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredBlob:
+        """
+        Stream the upload to a temporary file in chunks, hashing as it goes,
+        then move it to its content address.
+        """
+        tmp_path = os.path.join(self.tmp_dir, uuid4().hex)
+        hasher = hashlib.sha256()
+        size = 0
+
+        f = await run_in_threadpool(open, tmp_path, "wb")
+        try:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        except BaseException:
+            await run_in_threadpool(f.close)
+            await run_in_threadpool(os.remove, tmp_path)
+            raise
+        await run_in_threadpool(f.close)
+
+        sha256 = hasher.hexdigest()
+        key = self.blob_key(sha256, extension_for(upload.filename))
+        created = await run_in_threadpool(self._commit, tmp_path, os.path.join(self.root, key))
+        return StoredBlob(
+            key=key,
+            sha256=sha256,
+            size=size,
+            filename=upload.filename,
+            content_type=upload.content_type,
+            created=created,
+        )
+
+    def _commit(self, tmp_path: str, path: str) -> bool:
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return True
+
+    def url_path(self, key: str) -> str:
+        return f"uploads/{key}"
+
+    def local_path(self, key: str) -> str | None:
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, key))
+        # Refuse keys that escape the upload directory
+        if os.path.commonpath([root, path]) != root:
+            return None
+        return path
+
+
+# Register object-store backends here
+STORAGE_BACKENDS = {
+    "local": LocalStorage,
+}
+
+
+def get_storage(name: str = STORAGE_BACKEND) -> StorageBackend:
+    try:
+        return STORAGE_BACKENDS[name]()
+    except KeyError:
+        raise RuntimeError(f"Unknown STORAGE_BACKEND {name!r}")
+
+
+storage = get_storage()
@@ -0,0 +1,174 @@
+"""
+Streaming extraction of the two voice stress features: mean RMS energy and mean YIN pitch.
+
+Audio is decoded block by block straight to a low analysis sample rate, framed
+with strided NumPy views and reduced to running sums, so memory stays bounded no
+matter how long the recording is. Decoding stops early once enough voiced frames
+have been seen. The frame layout mirrors librosa's centred framing so results
+stay comparable with `librosa.feature.rms` / `librosa.yin`.
+"""
+import os
+import shutil
+import subprocess
+import numpy as np
+import soundfile as sf
+import soxr
+from numpy.lib.stride_tricks import sliding_window_view
+
+ANALYSIS_SR = int(os.getenv("VOICE_ANALYSIS_SR", 8000))
+# ~96 ms frames with ~24 ms hop, the same durations librosa uses at 22.05 kHz
+FRAME_LENGTH = 768
+HOP_LENGTH = 192
+FMIN = 50
+FMAX = 300
+TROUGH_THRESHOLD = 0.1
+# Stop decoding once this many voiced frames have been analyzed (0 = read the whole clip)
+MAX_VOICED_FRAMES = int(os.getenv("VOICE_MAX_VOICED_FRAMES", 400))
+BLOCK_SIZE = 16384
+
+
+def iter_audio_blocks(file_path: str, sr: int = ANALYSIS_SR, block_size: int = BLOCK_SIZE):
+    """
+    Yield mono float32 blocks resampled to `sr`.
+    Uses libsndfile when it knows the container, otherwise an ffmpeg pipe.
+    """
+    try:
+        sound_file = sf.SoundFile(file_path)
+    except RuntimeError:
+        yield from _iter_ffmpeg_blocks(file_path, sr, block_size)
+        return
+
+    with sound_file:
+        resampler = None
+        if sound_file.samplerate != sr:
+            resampler = soxr.ResampleStream(sound_file.samplerate, sr, 1, dtype="float32")
+        for block in sound_file.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1)
+            yield resampler.resample_chunk(mono) if resampler else mono
+        if resampler:
+            yield resampler.resample_chunk(np.zeros(0, dtype="float32"), last=True)
+
+
+def _iter_ffmpeg_blocks(file_path: str, sr: int, block_size: int):
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"Cannot decode {file_path}: unsupported by libsndfile and ffmpeg is not installed")
+
+    process = subprocess.Popen(
+        [ffmpeg, "-nostdin", "-v", "error", "-i", file_path, "-f", "f32le", "-ac", "1", "-ar", str(sr), "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while True:
+            data = process.stdout.read(block_size * 4)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype="<f4")
+    finally:
+        # Also reached when the consumer stops early
+        process.kill()
+        _, stderr = process.communicate()
+    if process.returncode not in (0, -9) and stderr:
+        raise RuntimeError(f"ffmpeg failed to decode {file_path}: {stderr.decode(errors='replace').strip()}")
+
+
+def frame_rms(frames: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+
+
+def frame_yin(frames: np.ndarray, sr: int = ANALYSIS_SR, fmin: float = FMIN, fmax: float = FMAX,
+              trough_threshold: float = TROUGH_THRESHOLD):
+    """
+    Vectorized YIN over a (n_frames, frame_length) array.
+    Returns (f0 per frame, voiced mask); unvoiced frames fall back to the global minimum
+    of the difference function, like librosa.yin.
+    """
+    frame_length = frames.shape[1]
+    min_period = int(np.floor(sr / fmax))
+    max_period = min(int(np.ceil(sr / fmin)), frame_length - 1)
+
+    frames = frames.astype(np.float64)
+
+    # Autocorrelation up to the longest period, via zero-padded FFT
+    spectrum = np.fft.rfft(frames, 2 * frame_length, axis=1)
+    acf = np.fft.irfft(np.abs(spectrum) ** 2, 2 * frame_length, axis=1)[:, :max_period + 1]
+
+    # Difference function: d(k) = 2 * (ACF(0) - ACF(k)) - sum_{m<k} y(m)^2
+    energy = np.cumsum(np.square(frames[:, :max_period]), axis=1)
+    diff = np.zeros_like(acf)
+    diff[:, 1:] = 2 * (acf[:, :1] - acf[:, 1:]) - energy
+
+    # Cumulative mean normalized difference function
+    numerator = diff[:, min_period:max_period + 1]
+    cumulative_mean = np.cumsum(diff[:, 1:], axis=1) / np.arange(1, max_period + 1)
+    denominator = cumulative_mean[:, min_period - 1:max_period]
+    cmndf = numerator / (denominator + np.finfo(np.float64).tiny)
+
+    # Parabolic interpolation around each lag
+    shifts = np.zeros_like(cmndf)
+    a_coef = cmndf[:, 2:] + cmndf[:, :-2] - 2 * cmndf[:, 1:-1]
+    b_coef = (cmndf[:, 2:] - cmndf[:, :-2]) / 2
+    valid = np.abs(b_coef) < np.abs(a_coef)
+    shifts[:, 1:-1] = np.where(valid, -b_coef / np.where(valid, a_coef, 1), 0)
+
+    # First trough below the threshold, else the global minimum
+    is_trough = np.zeros_like(cmndf, dtype=bool)
+    is_trough[:, 1:-1] = (cmndf[:, 1:-1] < cmndf[:, :-2]) & (cmndf[:, 1:-1] <= cmndf[:, 2:])
+    is_trough[:, 0] = cmndf[:, 0] < cmndf[:, 1]
+    below = is_trough & (cmndf < trough_threshold)
+    voiced = below.any(axis=1)
+    period = np.where(voiced, np.argmax(below, axis=1), np.argmin(cmndf, axis=1))
+
+    rows = np.arange(len(period))
+    f0 = sr / (min_period + period + shifts[rows, period])
+    return f0, voiced
+
+
+def extract_stress_features(file_path: str, sr: int = ANALYSIS_SR, frame_length: int = FRAME_LENGTH,
+                            hop_length: int = HOP_LENGTH, max_voiced_frames: int = MAX_VOICED_FRAMES) -> dict:
+    """
+    Mean RMS energy and mean YIN pitch of a recording, computed in one streaming pass.
+    """
+    pad = frame_length // 2
+    carry = np.zeros(pad, dtype=np.float32)  # centred framing, as librosa does
+    energy_sum = pitch_sum = 0.0
+    frame_count = voiced_count = 0
+    stopped_early = False
+
+    def consume(buffer: np.ndarray) -> np.ndarray:
+        nonlocal energy_sum, pitch_sum, frame_count, voiced_count
+        if len(buffer) < frame_length:
+            return buffer
+        frames = sliding_window_view(buffer, frame_length)[::hop_length]
+        f0, voiced = frame_yin(frames, sr)
+        energy_sum += float(frame_rms(frames).sum())
+        pitch_sum += float(f0.sum())
+        frame_count += len(frames)
+        voiced_count += int(voiced.sum())
+        return buffer[len(frames) * hop_length:]
+
+    blocks = iter_audio_blocks(file_path, sr)
+    try:
+        for block in blocks:
+            carry = consume(np.concatenate([carry, block]))
+            if max_voiced_frames and voiced_count >= max_voiced_frames:
+                stopped_early = True
+                break
+    finally:
+        blocks.close()
+
+    if not stopped_early:
+        # Trailing padding so the last samples get their own centred frames
+        consume(np.concatenate([carry, np.zeros(pad, dtype=np.float32)]))
+
+    if frame_count == 0:
+        raise ValueError(f"No audio frames could be read from {file_path}")
+
+    return {
+        "energy": energy_sum / frame_count,
+        "pitch": pitch_sum / frame_count,
+        "frames": frame_count,
+        "voiced_frames": voiced_count,
+        "stopped_early": stopped_early,
+    }
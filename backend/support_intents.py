@@ -0,0 +1,124 @@
+"""
+Local fast path for the support chatbot.
+
+Short messages that only ask for a helpline or emergency number are answered
+straight from the resource list; everything else is left for the LLM.
+"""
+import re
+import time
+from dataclasses import dataclass
+
+# Longer messages are usually someone telling their story and deserve a real reply
+MAX_ROUTED_WORDS = 20
+# Bare lookups like "police number" or "gbv helpline" count as requests
+MAX_KEYWORD_WORDS = 4
+
+# "what is the police number", "childline?", "give me helplines", "who can I call"
+_ASKS_FOR_CONTACT = re.compile(
+    r"\b(numbers?|helplines?|hotlines?|contact (details|info\w*)|who (can|do|should) i (call|phone|contact))\b"
+    r"|^\s*(police|emergency|childline|lifeline|gbv)( number)?\s*\??\s*$",
+    re.IGNORECASE,
+)
+_QUESTION_OR_REQUEST = re.compile(
+    r"\?|\b(what|what's|whats|which|who|where|give|send|share|list|need|want|"
+    r"tell|show|please|can i|how (do|can) i)\b",
+    re.IGNORECASE,
+)
+# Someone describing what is happening to them gets a real reply, even if they mention a number
+_NARRATIVE = re.compile(
+    r"\b(he|she|him|her|they|them|my (husband|boyfriend|partner|wife|girlfriend|ex|father|mother|uncle|boss))\b",
+    re.IGNORECASE,
+)
+
+# Resource keys per intent, in the order they are listed in the answer
+INTENTS = {
+    "emergency": (
+        re.compile(r"\b(emergency|emergencies|danger|urgent|right now|immediately|police|cops?|10111)\b", re.IGNORECASE),
+        ["Police Emergency", "GBV Helpline"],
+    ),
+    "child": (
+        re.compile(r"\b(child|children|kids?|childline|minor|teen(ager)?s?)\b", re.IGNORECASE),
+        ["Childline SA", "Police Emergency"],
+    ),
+    "counselling": (
+        re.compile(r"\b(lifeline|suicid\w*|depress\w*|counsell?(ing|or)?|therap\w*|mental)\b", re.IGNORECASE),
+        ["Lifeline SA", "GBV Helpline"],
+    ),
+    "hearing_impaired": (
+        re.compile(r"\b(deaf|hearing|sms|can'?t (talk|speak))\b", re.IGNORECASE),
+        ["SMS (hearing impaired)", "GBV Helpline"],
+    ),
+    "gbv": (
+        re.compile(r"\b(gbv|gender|abuse|abused|violence|domestic|rape|assault)\b", re.IGNORECASE),
+        ["GBV Helpline", "Stop Gender Violence", "Police Emergency"],
+    ),
+}
+
+
+@dataclass
+class RoutedReply:
+    intent: str
+    reply: str
+
+
+class IntentRouter:
+    """
+    Precompiled keyword router that answers contact-number requests locally.
+    Counts routing decisions and estimates the LLM time saved, using the
+    running average latency of the calls that were forwarded.
+    """
+
+    def __init__(self, resources: dict[str, str], max_words: int = MAX_ROUTED_WORDS):
+        self.resources = resources
+        self.max_words = max_words
+        self.routed: dict[str, int] = {name: 0 for name in [*INTENTS, "all_helplines"]}
+        self.forwarded = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def route(self, message: str) -> RoutedReply | None:
+        """
+        Return a local answer for contact-number requests, or None to forward to the LLM.
+        """
+        words = len(message.split())
+        if words > self.max_words or _NARRATIVE.search(message) or not _ASKS_FOR_CONTACT.search(message) \
+                or (words > MAX_KEYWORD_WORDS and not _QUESTION_OR_REQUEST.search(message)):
+            self.forwarded += 1
+            return None
+
+        for intent, (pattern, keys) in INTENTS.items():
+            if pattern.search(message):
+                return self._answer(intent, keys)
+        return self._answer("all_helplines", list(self.resources))
+
+    def _answer(self, intent: str, keys: list[str]) -> RoutedReply:
+        lines = [f"• {key}: {self.resources[key]}" for key in keys if key in self.resources]
+        reply = "Here are numbers you can reach right now:\n" + "\n".join(lines)
+        if intent == "emergency":
+            reply = "If you are in immediate danger, please call for help now.\n" + reply
+        reply += "\nYou're not alone — I'm here if you want to talk."
+
+        self.routed[intent] += 1
+        if self.llm_calls:
+            self.saved_seconds += self.llm_seconds / self.llm_calls
+        return RoutedReply(intent=intent, reply=reply)
+
+    def record_llm_latency(self, started: float):
+        """
+        Record how long a forwarded message took, from a time.perf_counter() start.
+        """
+        self.llm_calls += 1
+        self.llm_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        routed = sum(self.routed.values())
+        total = routed + self.forwarded
+        return {
+            "routed": routed,
+            "forwarded": self.forwarded,
+            "routed_ratio": round(routed / total, 4) if total else 0.0,
+            "by_intent": dict(self.routed),
+            "avg_llm_latency_ms": round(self.llm_seconds / self.llm_calls * 1000, 1) if self.llm_calls else None,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
@@ -0,0 +1,129 @@
+"""
+Delta sync and conditional-request helpers for list endpoints.
+
+Clients keep the opaque `next_since` token from a sync response and send it back
+as `?since=`; they receive rows changed after it plus the ids of deleted rows.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event, insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models import Incident, ChatMessage, Tombstone, utcnow
+from pagination import encode_cursor, decode_cursor
+
+# Rows committed slightly out of timestamp order are caught by re-reading this many seconds
+SYNC_SAFETY_WINDOW = float(os.getenv("SYNC_SAFETY_WINDOW", 5))
+
+
+# === ETAGS ===
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+async def collection_etag(db: AsyncSession, aggregate_query, request: Request) -> str:
+    """
+    ETag of a filtered collection from one aggregate row (e.g. count, max(updated_at),
+    max(id)) and the query string, so no entities are loaded to answer a revalidation.
+    """
+    row = (await db.execute(aggregate_query)).one()
+    raw = json.dumps([str(value) for value in row] + [str(request.url.query)])
+    return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """
+    A 304 response when the client's If-None-Match still matches, else None.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"etag": etag})
+    return None
+
+
+# === DELTAS ===
+def _decode_since(since: str | None) -> tuple[datetime, int] | None:
+    if not since:
+        return None
+    updated_at, row_id = decode_cursor(since, 2)
+    try:
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid since token")
+
+
+async def delta(db: AsyncSession, query, entity: str, since: str | None, limit: int, scope: str | None = None) -> dict:
+    """
+    Rows of `query` (a column select that includes id and updated_at) changed after
+    the `since` token, oldest change first, plus tombstones of `entity` rows deleted
+    since then. Without a token, returns a full snapshot.
+    """
+    model = query.column_descriptions[0]["entity"]
+    bound = _decode_since(since)
+    now = utcnow()
+
+    if bound is not None:
+        query = query.where(tuple_(model.updated_at, model.id) > bound)
+    result = await db.execute(query.order_by(model.updated_at.asc(), model.id.asc()).limit(limit + 1))
+    rows = result.all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        next_since = encode_cursor(rows[-1].updated_at, rows[-1].id)
+    else:
+        floor = now - timedelta(seconds=SYNC_SAFETY_WINDOW)
+        if bound is not None:
+            floor = max(floor, _aware(bound[0]))
+        next_since = encode_cursor(floor, 0)
+
+    deleted = []
+    if bound is not None:
+        tombstones = select(Tombstone.entity_id).where(
+            Tombstone.entity == entity, Tombstone.deleted_at > bound[0]
+        )
+        if scope is not None:
+            tombstones = tombstones.where(Tombstone.scope == scope)
+        deleted = list((await db.execute(tombstones)).scalars().all())
+
+    return {"items": rows, "deleted": deleted, "next_since": next_since, "has_more": has_more}
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# === TOMBSTONES ===
+async def record_tombstones(db: AsyncSession, entity: str, ids, scope: str | None = None):
+    """
+    Record deletions done with bulk DELETE statements, which skip the ORM hooks below.
+    """
+    ids = list(ids)
+    if ids:
+        deleted_at = utcnow()
+        await db.execute(insert(Tombstone), [
+            {"entity": entity, "entity_id": entity_id, "scope": scope, "deleted_at": deleted_at} for entity_id in ids
+        ])
+
+
+def _tombstone_on_delete(entity: str, scope_attr: str | None = None):
+    def after_delete(mapper, connection, target):
+        connection.execute(insert(Tombstone).values(
+            entity=entity,
+            entity_id=target.id,
+            scope=getattr(target, scope_attr) if scope_attr else None,
+            deleted_at=utcnow(),
+        ))
+    return after_delete
+
+
+event.listen(Incident, "after_delete", _tombstone_on_delete("incident", "reporter_email"))
+event.listen(ChatMessage, "after_delete", _tombstone_on_delete("chat_message"))
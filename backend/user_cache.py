@@ -0,0 +1,86 @@
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+import models
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+
+
+class UserCache:
+    """
+    Bounded LRU of resolved users keyed by token subject (email), with a TTL.
+    Entries must be invalidated whenever the underlying row changes.
+    """
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, models.User]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, email: str) -> models.User | None:
+        entry = self._entries.get(email)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[email]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(email)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, email: str, user: models.User):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._entries[email] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *emails: str | None):
+        for email in emails:
+            if email is not None and self._entries.pop(email, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache()
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> models.User | None:
+    """
+    Resolve a token subject to a user, going to the database only on a cache miss.
+    Cached users are detached from any session and must be treated as read-only.
+    """
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalars().first()
+    if user is not None:
+        db.expunge(user)
+        user_cache.set(email, user)
+    return user
@@ -0,0 +1,227 @@
+"""
+Voice stress analysis jobs.
+
+With VOICE_JOBS_MODE=inline (default) each web process analyzes its own uploads on
+a process pool. With VOICE_JOBS_MODE=worker web processes only store the job and
+a separate `python voice_jobs.py` process picks up pending jobs from the database,
+so web workers never fork analysis processes or load the audio stack.
+"""
+import os
+import signal
+import asyncio
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+from database import AsyncSessionLocal
+from models import VoiceNote
+from metrics import time_external
+from notifications import enqueue_notification
+
+# Number of analysis processes (and queue consumers)
+VOICE_WORKERS = int(os.getenv("VOICE_WORKERS", 2))
+# "inline" (analyze in the web process) or "worker" (leave jobs to python voice_jobs.py)
+VOICE_JOBS_MODE = os.getenv("VOICE_JOBS_MODE", "inline")
+# How often the standalone worker looks for jobs stored by web processes
+VOICE_POLL_INTERVAL = float(os.getenv("VOICE_POLL_INTERVAL", 2))
+# Seconds an analysis may run before the job is marked failed
+VOICE_JOB_TIMEOUT = float(os.getenv("VOICE_JOB_TIMEOUT", 300))
+# A "processing" job whose claim is older than this is assumed abandoned (crashed process) and run again
+VOICE_JOB_LEASE = float(os.getenv("VOICE_JOB_LEASE", VOICE_JOB_TIMEOUT + 60))
+
+
+def stress_level_for(energy: float, pitch: float) -> str:
+    if energy > 0.03 and pitch > 200:
+        return "High Stress"
+    elif energy > 0.02:
+        return "Moderate Stress"
+    return "Low/No Stress"
+
+
+def analyze_stress(file_path: str) -> dict:
+    """
+    Runs inside a worker process, so the event loop never waits on audio decoding.
+    """
+    from stress_features import extract_stress_features
+
+    features = extract_stress_features(file_path)
+    energy, pitch = features["energy"], features["pitch"]
+    return {"energy": energy, "pitch": pitch, "stress_level": stress_level_for(energy, pitch)}
+
+
+class VoiceJobQueue:
+    """
+    Queue of pending voice analyses processed on a ProcessPoolExecutor.
+
+    Each job is a VoiceNote id; its status moves from "pending" to "processing"
+    (claimed with a conditional UPDATE that stamps claimed_at, so several processes
+    never analyze the same recording) and then "done" or "failed". Only jobs still
+    "processing" after VOICE_JOB_LEASE (their process died) are claimed again.
+    `on_complete(voice_note)` runs after a successful analysis.
+    """
+
+    def __init__(self, workers: int = VOICE_WORKERS):
+        self.workers = workers
+        self.on_complete = None
+        self._queue: asyncio.Queue | None = None
+        self._queued: set[int] = set()
+        self._executor: ProcessPoolExecutor | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, on_complete=None, poll: bool = False):
+        """
+        Start the consumers. With `poll`, also pick up jobs stored by other processes.
+        """
+        self.on_complete = on_complete
+        self._queue = asyncio.Queue()
+        # Analysis processes are only spawned once the first job is submitted
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        # Pick up jobs that were still pending when the server last stopped, and expired claims
+        await self._submit_pending()
+        if poll:
+            self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, voice_note_id: int):
+        # Not started in this process (VOICE_JOBS_MODE=worker): the standalone worker polls for it
+        if self._queue is None or voice_note_id in self._queued:
+            return
+        self._queued.add(voice_note_id)
+        self._queue.put_nowait(voice_note_id)
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            VoiceNote.status == "pending",
+            and_(
+                VoiceNote.status == "processing",
+                or_(VoiceNote.claimed_at.is_(None),
+                    VoiceNote.claimed_at < now - timedelta(seconds=VOICE_JOB_LEASE)),
+            ),
+        )
+
+    async def _submit_pending(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(VoiceNote.id).where(self._claimable(datetime.now(timezone.utc))).order_by(VoiceNote.id)
+            )
+            for voice_note_id in result.scalars().all():
+                self.submit(voice_note_id)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(VOICE_POLL_INTERVAL)
+            try:
+                await self._submit_pending()
+            except Exception as e:
+                print("Voice job poll error:", e)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            voice_note_id = await self._queue.get()
+            try:
+                await self._run(loop, voice_note_id)
+            except Exception as e:
+                print(f"Voice job {voice_note_id} error:", e)
+            finally:
+                self._queued.discard(voice_note_id)
+                self._queue.task_done()
+
+    async def _run(self, loop, voice_note_id: int):
+        claimed_at = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            claimed = await db.execute(
+                update(VoiceNote)
+                .where(VoiceNote.id == voice_note_id, self._claimable(claimed_at))
+                .values(status="processing", claimed_at=claimed_at)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return
+            result = await db.execute(select(VoiceNote.file_path).where(VoiceNote.id == voice_note_id))
+            file_path = result.scalar_one()
+
+        # No DB connection is held while the recording is analyzed. The timeout keeps
+        # the result inside the lease; the analysis process itself runs to completion
+        try:
+            with time_external("voice_analysis", "extract_stress_features"):
+                analysis = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, analyze_stress, file_path), VOICE_JOB_TIMEOUT
+                )
+        except Exception as e:
+            await self._finish(voice_note_id, claimed_at, status="failed", error=str(e) or type(e).__name__)
+            raise
+
+        voice_note = await self._finish(voice_note_id, claimed_at, status="done", **analysis)
+        if voice_note is not None and self.on_complete is not None:
+            await self.on_complete(voice_note)
+
+    async def _finish(self, voice_note_id: int, claimed_at: datetime, **values) -> VoiceNote | None:
+        # Only the holder of the current claim records a result (and raises the alert)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(VoiceNote)
+                .where(VoiceNote.id == voice_note_id, VoiceNote.status == "processing",
+                       VoiceNote.claimed_at == claimed_at)
+                .values(completed_at=datetime.now(timezone.utc), **values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if result.rowcount != 1:
+                print(f"Voice job {voice_note_id}: lease expired before the result was saved")
+                return None
+            result = await db.execute(select(VoiceNote).where(VoiceNote.id == voice_note_id))
+            return result.scalar_one()
+
+
+async def send_stress_alert(voice_note: VoiceNote):
+    """
+    Completion hook: queue a WhatsApp text with the analysis result.
+    """
+    if not voice_note.phone:
+        return
+
+    async with AsyncSessionLocal() as db:
+        await enqueue_notification(
+            db,
+            voice_note.phone,
+            f"🚨 Stress detected!\nLevel: {voice_note.stress_level}\nEnergy: {voice_note.energy:.4f}\nPitch: {voice_note.pitch:.2f} Hz",
+        )
+
+
+voice_jobs = VoiceJobQueue()
+
+
+if __name__ == "__main__":
+    async def _main():
+        # Standalone analysis worker for VOICE_JOBS_MODE=worker deployments
+        await voice_jobs.start(on_complete=send_stress_alert, poll=True)
+        print(f"Voice worker running with {voice_jobs.workers} analysis process(es)")
+
+        # Stop cleanly on SIGTERM too, so the analysis processes are shut down with us
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+        try:
+            await stopping.wait()
+        finally:
+            await voice_jobs.stop()
+
+    asyncio.run(_main())